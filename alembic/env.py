@@ -1,18 +1,21 @@
 import os
+import re
 import sys
-from logging.config import fileConfig
-from urllib.parse import urlparse, parse_qs, urlunparse
+from functools import lru_cache
+from logging.config import dictConfig
 
 # Import create_engine explicitly
 from sqlalchemy import engine_from_config, create_engine 
-from sqlalchemy import pool
 from sqlalchemy import MetaData
 
 from alembic import context
 
 # Import models directly, but avoid importing Base from database
 # to prevent triggering FastAPI app config loading during migration generation.
-sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+# abspath is pure string manipulation (realpath stats every path component)
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
 # from src.core.database import Base # REMOVED
 # Import models, trying Project before User to potentially resolve circular import.
 from src.models.project import Project, ProjectApiKey, ProjectMember
@@ -26,20 +29,70 @@ config = context.config
 # This avoids importing the full FastAPI config during Alembic execution if possible
 DB_URL_ENV_VAR = "ALEMBIC_DATABASE_URL"
 
-# Interpret the config file for Python logging.
+# Splits a database URL into base scheme (driver suffix dropped), the
+# authority+path part and the optional query string in a single match
+_URL_RE = re.compile(r'^([^:+]+)(?:\+[^:]+)?://([^?]+)(?:\?(.*))?$')
+
+def _split_db_url(db_url: str) -> tuple[str, str, str]:
+    """Return (base_scheme, rest, query) for a database URL."""
+    m = _URL_RE.match(db_url)
+    if not m:
+        raise ValueError(f"Invalid database URL in {DB_URL_ENV_VAR}.")
+    return m.group(1), m.group(2), m.group(3) or ''
+
+# Python logging setup, equivalent to the [loggers]/[handlers]/[formatters]
+# sections of alembic.ini but without re-reading and parsing the .ini file
+_LOG_CFG = {
+    "version": 1,
+    "formatters": {
+        "generic": {
+            "format": "%(levelname)-5.5s [%(name)s] %(message)s",
+            "datefmt": "%H:%M:%S",
+        },
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stderr",
+            "level": "NOTSET",
+            "formatter": "generic",
+        },
+    },
+    "loggers": {
+        "sqlalchemy.engine": {"level": "WARN", "handlers": []},
+        "alembic": {"level": "INFO", "handlers": []},
+    },
+    "root": {"level": "WARN", "handlers": ["console"]},
+}
+
 # This line sets up loggers basically.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    dictConfig(_LOG_CFG)
 
-# Define target_metadata using MetaData directly
-# Alembic will implicitly pick up metadata from imported models.
-target_metadata = MetaData() 
+# Define target_metadata using MetaData directly, populated with the tables
+# of the imported models so autogenerate diffs against the actual schema
+target_metadata = MetaData()
+for model in (User, RefreshToken, Project, ProjectApiKey, ProjectMember):
+    model.__table__.to_metadata(target_metadata)
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+@lru_cache(maxsize=4)
+def _get_engine(engine_url: str, connect_args_frozen: frozenset):
+    """Create the migration engine once per process and reuse it.
+
+    A pooled engine keeps one warm connection for the whole migration run
+    instead of paying a new TCP/TLS handshake each time one is needed.
+    """
+    return create_engine(
+        engine_url, # Use URL with forced dialect
+        pool_pre_ping=True,
+        connect_args=dict(connect_args_frozen)
+    )
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -58,10 +111,9 @@ def run_migrations_offline() -> None:
         raise ValueError(f"Environment variable {DB_URL_ENV_VAR} not set for offline migration.")
     
     # Clean URL for offline mode just in case
-    parsed_url = urlparse(db_url)
     # Ensure scheme is correct for offline mode (psycopg2 might not be needed here, but consistency is good)
-    offline_scheme = parsed_url.scheme.split('+')[0] # Get base scheme (e.g., postgresql)
-    cleaned_url = urlunparse(parsed_url._replace(scheme=offline_scheme, query=''))
+    offline_scheme, rest, _ = _split_db_url(db_url) # Base scheme (e.g., postgresql)
+    cleaned_url = f"{offline_scheme}://{rest}"
 
     context.configure(
         url=cleaned_url, # Use cleaned URL
@@ -91,23 +143,20 @@ def run_migrations_online() -> None:
         raise ValueError(f"Environment variable {DB_URL_ENV_VAR} not set for online migration.")
 
     # Parse the URL to extract connect_args like sslmode
-    parsed_url = urlparse(db_url)
-    query_params = parse_qs(parsed_url.query)
+    _, rest, query = _split_db_url(db_url)
     connect_args = {}
-    if 'sslmode' in query_params:
-        # psycopg2 uses sslmode directly in connect_args
-        connect_args["sslmode"] = query_params['sslmode'][0]
+    if query:
+        query_params = dict(p.split('=', 1) for p in query.split('&') if '=' in p)
+        if 'sslmode' in query_params:
+            # psycopg2 uses sslmode directly in connect_args
+            connect_args["sslmode"] = query_params['sslmode']
 
     # Rebuild the URL without the query string AND force the psycopg2 dialect
     # Ensure the original scheme doesn't contain +asyncpg etc.
-    engine_url = urlunparse(parsed_url._replace(scheme='postgresql+psycopg2', query=''))
+    engine_url = f"postgresql+psycopg2://{rest}"
 
-    # Create engine manually using the forced dialect URL and connect_args
-    connectable = create_engine(
-        engine_url, # Use URL with forced dialect
-        poolclass=pool.NullPool,
-        connect_args=connect_args
-    )
+    # Reuse the cached engine for this URL/connect_args combination
+    connectable = _get_engine(engine_url, frozenset(connect_args.items()))
 
     with connectable.connect() as connection:
         context.configure(
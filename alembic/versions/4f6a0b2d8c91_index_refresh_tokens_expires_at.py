@@ -0,0 +1,36 @@
+"""Index refresh_tokens.expires_at
+
+Revision ID: 4f6a0b2d8c91
+Revises: e27a9c4b8f13
+Create Date: 2026-10-16 11:02:36.184529
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f6a0b2d8c91'
+down_revision: Union[str, None] = 'e27a9c4b8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_refresh_tokens_expires_at',
+            'refresh_tokens',
+            ['expires_at'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_refresh_tokens_expires_at',
+            table_name='refresh_tokens',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,43 @@
+"""Unique project members
+
+Revision ID: 7c2e9a4d1b53
+Revises: 4f6a0b2d8c91
+Create Date: 2026-10-16 15:21:07.412853
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a4d1b53'
+down_revision: Union[str, None] = '4f6a0b2d8c91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the oldest row of any user added twice to the same project
+    op.execute(
+        """
+        DELETE FROM project_members a
+        USING project_members b
+        WHERE a.project_id = b.project_id
+          AND a.user_id = b.user_id
+          AND (a.created_at, a.id) > (b.created_at, b.id)
+        """
+    )
+    op.create_unique_constraint(
+        'uq_project_members_project_id_user_id',
+        'project_members',
+        ['project_id', 'user_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'uq_project_members_project_id_user_id',
+        'project_members',
+        type_='unique'
+    )
@@ -0,0 +1,36 @@
+"""Index projects for keyset pagination
+
+Revision ID: c5d81f3e9b26
+Revises: 3b9c1e7d5a42
+Create Date: 2026-10-16 10:05:48.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d81f3e9b26'
+down_revision: Union[str, None] = '3b9c1e7d5a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_projects_owner_id_created_at_id',
+            'projects',
+            ['owner_id', 'created_at', 'id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_projects_owner_id_created_at_id',
+            table_name='projects',
+            postgresql_concurrently=True
+        )
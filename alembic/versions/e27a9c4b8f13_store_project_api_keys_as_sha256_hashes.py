@@ -0,0 +1,44 @@
+"""Store project API keys as SHA-256 hashes
+
+Revision ID: e27a9c4b8f13
+Revises: c5d81f3e9b26
+Create Date: 2026-10-16 10:38:12.470865
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e27a9c4b8f13'
+down_revision: Union[str, None] = 'c5d81f3e9b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('project_api_keys', sa.Column('key_hash', sa.LargeBinary(length=32), nullable=True))
+    op.add_column('project_api_keys', sa.Column('key_prefix', sa.String(length=20), nullable=True))
+    # Same digest and prefix as src.core.crud.api_key.new_api_key, issued keys keep working
+    op.execute(
+        "UPDATE project_api_keys "
+        "SET key_hash = sha256(convert_to(key, 'UTF8')), key_prefix = left(key, 18)"
+    )
+    op.alter_column('project_api_keys', 'key_hash', nullable=False)
+    op.alter_column('project_api_keys', 'key_prefix', nullable=False)
+    op.create_unique_constraint('project_api_keys_key_hash_key', 'project_api_keys', ['key_hash'])
+    # Also drops the unique constraint on key
+    op.drop_column('project_api_keys', 'key')
+
+
+def downgrade() -> None:
+    # Raw keys can't be recovered from their hashes: existing keys get a
+    # unique placeholder and are deactivated, owners have to create new ones
+    op.add_column('project_api_keys', sa.Column('key', sa.VARCHAR(length=64), nullable=True))
+    op.execute("UPDATE project_api_keys SET key = 'revoked_' || id, is_active = false")
+    op.alter_column('project_api_keys', 'key', nullable=False)
+    op.create_unique_constraint('project_api_keys_key_key', 'project_api_keys', ['key'])
+    op.drop_column('project_api_keys', 'key_prefix')
+    op.drop_column('project_api_keys', 'key_hash')
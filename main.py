@@ -1,21 +1,14 @@
+import asyncio
 import os
 import uvicorn
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from src.core.config import get_settings
-from src.core.database import get_db, init_db
-
-from src.api.v1 import router as api_v1_router
 
 settings = get_settings()
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version="1.0.0", 
-    description="A minimalist authentication API"
-)
-
 # Setup CORS middleware
 # Configure allowed origins
 origins = [
@@ -26,39 +19,150 @@ origins = [
     # Avoid using "*" in production if allow_credentials=True
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins, # Use the configured list
-    allow_credentials=True, # Allow cookies
-    allow_methods=["*"], # Allow all standard methods
-    allow_headers=["*"], # Allow all headers
-)
+class HealthCheckMiddleware:
+    """
+    Answer /health directly at the ASGI level.
+    Registered last so it is the outermost middleware: uptime pings skip
+    CORS processing and routing entirely. Also reports how many bcrypt jobs
+    are waiting, to tell a saturated password pool apart from a slow database.
+    """
+
+    def __init__(self, app):
+        from src.core.security.password import password_pool_pending
+
+        self.app = app
+        self._password_pool_pending = password_pool_pending
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/health":
+            response = ORJSONResponse({
+                "status": "healthy",
+                "password_pool_pending": self._password_pool_pending()
+            })
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+class RequestUserCacheMiddleware:
+    """
+    Give each HTTP request its own user lookup cache, so the auth dependency
+    and the endpoint don't load the same user twice.
+    """
+
+    def __init__(self, app):
+        from src.core.crud.user import start_request_user_cache, end_request_user_cache
 
-app.include_router(api_v1_router)
+        self.app = app
+        self._start = start_request_user_cache
+        self._end = end_request_user_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = self._start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._end(token)
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application.
+
+    The API routers (and with them SQLAlchemy, pydantic schemas, bcrypt and
+    the JWT helpers) are imported here rather than at module top so that importing this
+    module stays cheap until the app is actually built.
+    """
+    from src.api.v1 import router as api_v1_router
+
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        version="1.0.0", 
+        description="A minimalist authentication API",
+        default_response_class=ORJSONResponse
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins, # Use the configured list
+        allow_credentials=True, # Allow cookies
+        allow_methods=["*"], # Allow all standard methods
+        allow_headers=["*"], # Allow all headers
+    )
+    app.add_middleware(RequestUserCacheMiddleware)
+    # Added after CORS so it wraps it (last added runs first)
+    app.add_middleware(HealthCheckMiddleware)
 
-@app.on_event("startup")
-async def on_startup():
-    print("Starting up and initializing database...")
-    await init_db()
-    print("Database initialized.")
+    app.include_router(api_v1_router)
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+    from src.core.security.password import PasswordPoolBusy
 
-@app.get("/")
-async def read_root():
-    return {"message": f"Welcome to {settings.PROJECT_NAME}"}
+    @app.exception_handler(PasswordPoolBusy)
+    async def password_pool_busy(request, exc):
+        # Shed load instead of letting logins pile up behind the bcrypt pool
+        return ORJSONResponse(
+            status_code=503,
+            content={"detail": "Server busy, retry shortly"},
+            headers={"Retry-After": "1"}
+        )
+
+    background_tasks = []
+
+    @app.on_event("startup")
+    async def on_startup():
+        from src.core.database import init_db, get_async_session_factory
+        from src.core.crud.api_key import write_api_key_usage_periodically
+        from src.core.crud.auth import cleanup_expired_tokens_periodically
+
+        from src.core.security.password import get_password_pool
+
+        print("Starting up and initializing database...")
+        await init_db()
+        print("Database initialized.")
+        # Start the bcrypt workers before the first login needs them
+        get_password_pool()
+        session_factory = get_async_session_factory()
+        background_tasks.append(asyncio.create_task(
+            write_api_key_usage_periodically(
+                session_factory, settings.API_KEY_USAGE_FLUSH_SECONDS
+            )
+        ))
+        background_tasks.append(asyncio.create_task(
+            cleanup_expired_tokens_periodically(
+                session_factory, settings.REFRESH_TOKEN_CLEANUP_SECONDS
+            )
+        ))
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        from src.core.security.password import shutdown_password_pool
+
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        shutdown_password_pool()
+
+    @app.get("/")
+    async def read_root():
+        return {"message": f"Welcome to {settings.PROJECT_NAME}"}
+
+    return app
+
+app = create_app()
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000)) 
+    # Auto-reload spawns a file watcher, only enable it for local development
+    reload = os.getenv("UVICORN_RELOAD", "0") == "1"
+    # One worker per core by default; the reloader only supports a single process
+    workers = 1 if reload else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
     uvicorn.run(
         "main:app", 
         host="0.0.0.0", 
         port=port, 
-        reload=True # Reload should be False in production
+        reload=reload,
+        workers=workers,
+        # uvloop and httptools come with uvicorn[standard]
+        loop="uvloop",
+        http="httptools"
     )
-
-
-
-
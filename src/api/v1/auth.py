@@ -4,54 +4,64 @@ from typing import Optional, cast
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-# Remove sync session imports if no longer needed elsewhere
-# from sqlalchemy.orm import Session 
-# from sqlalchemy.orm import sessionmaker
-# from sqlalchemy.ext.asyncio import async_sessionmaker 
-
-# Use get_db for async session, remove sync and factory dependencies
-from src.core.database import get_db 
-from src.core.security.password import hash_password, verify_password, is_password_strong
-from src.core.security.jwt import create_access_token, create_refresh_token, decode_token, verify_token_type
+
+from src.core.database import get_db
+from src.core.security.password import (
+    hash_password,
+    hash_password_async,
+    verify_password_async,
+    verify_password_cached,
+    is_password_strong,
+    needs_rehash,
+    PasswordPoolBusy
+)
+from src.core.security.jwt import create_access_token, create_token_pair, decode_token, verify_token_type
 # Use async get_user_by_email
-from src.core.crud.user import get_user_by_email, create_user, get_user_by_id 
+from src.core.crud.user import get_user_by_email, create_user_if_absent, update_user_password
 from src.core.crud.auth import (
     create_refresh_token as create_db_refresh_token,
-    get_refresh_token,
+    get_refresh_token_with_user,
     revoke_refresh_token,
     revoke_user_refresh_tokens
 )
-from src.core.dependencies.auth import get_current_user
-from src.schemas.user import UserCreate, UserRead
+from src.core.dependencies.auth import get_current_principal, TokenPrincipal
+from src.core.config import get_settings
+from src.schemas.user import UserCreate, UserRead, user_read_from_orm
 from src.schemas.auth import Token, TokenRefresh
-from src.models.user import User
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
+# Lifetime of stored refresh tokens, built once instead of per login
+_REFRESH_TTL = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# Hash computed once at import, verified against when the email is unknown so
+# that login takes the same bcrypt time whether or not the user exists
+_DUMMY_HASH = hash_password("invalid")
+
+# Set-Cookie headers clearing the auth cookies, built once. Same attributes
+# as response.delete_cookie() but with a fixed past expiry date, so they
+# don't have to be re-encoded on every call.
+_CLEAR_AUTH_COOKIES = tuple(
+    (b"set-cookie", f'{name}=""; expires=Thu, 01 Jan 1970 00:00:00 GMT; Max-Age=0; Path=/; SameSite=lax'.encode("latin-1"))
+    for name in ("access_token", "refresh_token")
+)
+
 @router.post("/register", response_model=UserRead)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
 ) -> UserRead:
     """Register a new platform user (project_id=None)."""
-    # Check if email already exists for platform users (project_id=None)
-    existing_user = await get_user_by_email(db, user_data.email, project_id=None)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered for platform user"
-        )
-    
     # Vérifier que les mots de passe correspondent
-    try:
-        user_data.validate_passwords_match()
-    except ValueError as e:
+    if not user_data.passwords_match():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
+            detail="Passwords do not match"
         )
     
     # Vérifier la force du mot de passe
@@ -61,11 +71,19 @@ async def register(
             detail="Password is not strong enough"
         )
     
-    # Create the platform user (project_id=None)
-    hashed_password = hash_password(user_data.password)
-    user = await create_user(db, user_data, hashed_password, project_id=None)
+    # bcrypt is CPU-bound, run it in the bcrypt pool off the event loop
+    hashed_password = await hash_password_async(user_data.password)
+
+    # Create the platform user (project_id=None) unless the email is already
+    # registered, in a single round-trip
+    user = await create_user_if_absent(db, user_data, hashed_password, project_id=None)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered for platform user"
+        )
     
-    return UserRead.model_validate(user)
+    return user_read_from_orm(user)
 
 @router.post("/login", response_model=Token)
 async def login(
@@ -84,7 +102,12 @@ async def login(
         user = await get_user_by_email(db, form_data.username, project_id=None) # Use async db and function
         logger.info(f"User found: {bool(user)}")
         
-        if not user or not verify_password(form_data.password, user.hashed_password):
+        # bcrypt is CPU-bound, run it in the bcrypt pool off the event loop
+        if user:
+            password_valid = await verify_password_cached(user.id, form_data.password, user.hashed_password)
+        else:
+            password_valid = await verify_password_async(form_data.password, _DUMMY_HASH)
+        if not user or not password_valid:
             logger.warning(f"Login failed: Incorrect email or password for {form_data.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -101,9 +124,13 @@ async def login(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        if needs_rehash(user.hashed_password):
+            # Upgrade the stored hash to the configured bcrypt cost
+            new_hash = await hash_password_async(form_data.password)
+            await update_user_password(db, user, new_hash)
+        
         logger.info(f"User {user.email} is active. Creating tokens...")
-        access_token = create_access_token(subject=user.id)
-        refresh_token = create_refresh_token(subject=user.id)
+        access_token, refresh_token = create_token_pair(subject=user.id)
         logger.info(f"Tokens created for user: {user.email}")
         
         # Store the refresh token using the standard async session
@@ -113,7 +140,7 @@ async def login(
             db=db, # Pass the standard async session from Depends(get_db)
             user_id=user.id,
             token=refresh_token,
-            expires_delta=timedelta(days=7), # TODO: Use settings
+            expires_delta=_REFRESH_TTL,
             user_agent=user_agent
         )
         logger.info(f"Refresh token stored successfully for user: {user.email}")
@@ -125,6 +152,9 @@ async def login(
             refresh_token=refresh_token,
             token_type="bearer"
         )
+    except (HTTPException, PasswordPoolBusy):
+        # 401s and the bcrypt pool's 503 go out as they are
+        raise
     except Exception as e:
         # Log any unexpected exception before raising HTTP 500
         logger.exception(f"Unexpected error during login for {form_data.username}: {e}")
@@ -135,7 +165,6 @@ async def login(
 
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
-    # Remove response: Response
     # Accept refresh token from body using TokenRefresh schema
     refresh_data: TokenRefresh, 
     db: AsyncSession = Depends(get_db)
@@ -143,13 +172,15 @@ async def refresh_token(
     """Get a new access token using refresh token provided in the request body."""
     token = refresh_data.refresh_token
 
-    # 1. Check if the refresh token exists and is valid in DB
-    db_refresh_token = await get_refresh_token(db, token)
-    if not db_refresh_token:
+    # 1. Check if the refresh token exists and is valid in DB, loading its
+    # user in the same query
+    token_with_user = await get_refresh_token_with_user(db, token)
+    if not token_with_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token (DB check)",
         )
+    db_refresh_token, user = token_with_user
 
     # 2. Decode the refresh token to verify type and get user ID
     try:
@@ -158,7 +189,7 @@ async def refresh_token(
             raise HTTPException(status_code=401, detail="Invalid token type") 
         payload = decode_token(token) # Checks expiry as well
         user_id = cast(str, payload.get("sub"))
-        if not user_id:
+        if not user_id or user_id != db_refresh_token.user_id:
             raise HTTPException(status_code=401, detail="Invalid token payload")
     except HTTPException as e:
         # If decode fails (e.g., expired), revoke from DB and raise
@@ -169,10 +200,9 @@ async def refresh_token(
             detail=f"Refresh token invalid: {e.detail}"
         ) from e
 
-    # 3. Get the user associated with the token
-    user = await get_user_by_id(db, user_id)
-    # Check user existence and activity (db_refresh_token confirms token validity)
-    if not user or not user.is_active:
+    # 3. Check activity of the user loaded with the token
+    # (db_refresh_token confirms token validity)
+    if not user.is_active:
         # If user is gone or inactive, the refresh token is effectively invalid
         await revoke_refresh_token(db, token) # Revoke the now useless token
         raise HTTPException(
@@ -191,16 +221,6 @@ async def refresh_token(
     # 5. Issue a new access token
     new_access_token = create_access_token(subject=user.id)
     
-    # REMOVE Cookie setting
-    # response.set_cookie(
-    #     key="access_token",
-    #     value=access_token,
-    #     httponly=True,
-    #     secure=True, # Set to True in production with HTTPS
-    #     samesite="lax", # Or None if needed, but maybe not required for refresh?
-    #     max_age=3600  # 1 heure
-    # )
-    
     # 6. Return new access token and original refresh token in body
     return Token(
         access_token=new_access_token,
@@ -210,11 +230,8 @@ async def refresh_token(
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
-    # Remove response: Response
     # Accept refresh token from body using TokenRefresh schema
     refresh_data: TokenRefresh, 
-    # Remove current_user dependency, not needed to revoke a specific token
-    # current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> None: # Return None for 204 No Content
     """Logout platform user by revoking the provided refresh token."""
@@ -225,17 +242,14 @@ async def logout(
     revoked = await revoke_refresh_token(db, token_to_revoke)
     logger.info(f"Logout attempt for refresh token: {token_to_revoke[:10]}... Revoked: {revoked}")
     
-    # REMOVE Cookie deletion
-    # response.delete_cookie(key="access_token")
-    # response.delete_cookie(key="refresh_token")
-    
     # Return nothing for 204 No Content
     return None
 
 @router.post("/logout-all")
 async def logout_all_devices(
     response: Response,
-    current_user: User = Depends(get_current_user),
+    # Only the user id is needed, taken from the verified token without a DB lookup
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Logout platform user from all devices by revoking all their refresh tokens."""
@@ -244,7 +258,6 @@ async def logout_all_devices(
     await revoke_user_refresh_tokens(db, current_user.id)
     
     # Supprimer les cookies
-    response.delete_cookie(key="access_token")
-    response.delete_cookie(key="refresh_token")
+    response.raw_headers.extend(_CLEAR_AUTH_COOKIES)
     
     return {"detail": "Successfully logged out from all devices"} 
\ No newline at end of file
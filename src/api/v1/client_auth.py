@@ -1,32 +1,41 @@
 from typing import Annotated, Optional
 from datetime import timedelta # Import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request # Import Request
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response # Import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Core components
 from src.core.database import get_db
-from src.core.crud.user import create_user, get_user_by_email, get_user_by_id # Added get_user_by_id
-from src.core.security.password import hash_password, is_password_strong, verify_password # Import verify_password
-from src.core.dependencies.project_auth import validate_api_key, get_current_client_user # Updated dependencies import
+from src.core.crud.user import create_user, get_user_by_email, update_user_password
+from src.core.security.password import hash_password_async, is_password_strong, verify_password_cached, needs_rehash
+from src.core.dependencies.project_auth import ApiKeyProject, validate_api_key, get_current_client_user # Updated dependencies import
 # Import JWT and auth CRUD functions
-from src.core.security.jwt import create_access_token, create_refresh_token, decode_token, verify_token_type # Added decode/verify
+from src.core.security.jwt import create_access_token, create_token_pair, decode_token, verify_token_type # Added decode/verify
 from src.core.crud.auth import ( # Grouped imports
     create_refresh_token as create_db_refresh_token,
-    get_refresh_token, # Added get_refresh_token
+    get_refresh_token_with_user,
     revoke_refresh_token # Added revoke_refresh_token
 )
 from src.core.config import get_settings # Import settings
 
 # Schemas and Models
-from src.schemas.user import UserCreate, UserRead
+from src.schemas.user import UserCreate, UserRead, user_read_from_orm
 from src.schemas.auth import Token, ClientLogin, TokenRefresh, TokenPayload # Added TokenRefresh and TokenPayload
-from src.models.project import Project
 from src.models.user import User
+from src.api.v1.etag import version_etag, is_not_modified, not_modified, json_with_etag
 
 # Get settings instance once at module level
 settings = get_settings()
 
+# Lifetime of stored refresh tokens, built once instead of per login
+_REFRESH_TTL = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+# Serialized /user responses keyed by (user.id, user.updated_at): any ORM
+# update bumps updated_at, so a stale body is never served after a change
+_user_info_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
 # Define the router for client authentication endpoints
 router = APIRouter(
     prefix="/client/auth",
@@ -38,7 +47,7 @@ router = APIRouter(
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register_project_user(
     user_data: UserCreate, # Reuse the UserCreate schema
-    project: Annotated[Project, Depends(validate_api_key)], # Use dependency to get Project from API Key
+    project: Annotated[ApiKeyProject, Depends(validate_api_key)], # Use dependency to get Project from API Key
     db: AsyncSession = Depends(get_db)
 ) -> UserRead:
     """Register a new end-user for the specific project identified by the API key."""
@@ -52,12 +61,10 @@ async def register_project_user(
         )
     
     # Validate password match
-    try:
-        user_data.validate_passwords_match()
-    except ValueError as e:
+    if not user_data.passwords_match():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
+            detail="Passwords do not match"
         )
     
     # Validate password strength
@@ -68,18 +75,18 @@ async def register_project_user(
         )
     
     # Create the end-user associated with the project
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     # Pass the validated project.id to create_user
     new_user = await create_user(db, user_data, hashed_password, project_id=project.id)
     
     # Return the created user details (excluding password)
-    return UserRead.model_validate(new_user)
+    return user_read_from_orm(new_user)
 
 @router.post("/login", response_model=Token)
 async def login_project_user(
     request: Request, # Inject request to get headers
     login_data: ClientLogin, # Use the new ClientLogin schema
-    project: Annotated[Project, Depends(validate_api_key)], # Get Project from API Key
+    project: Annotated[ApiKeyProject, Depends(validate_api_key)], # Get Project from API Key
     db: AsyncSession = Depends(get_db)
 ) -> Token:
     """Login an end-user for the specific project identified by the API key."""
@@ -88,7 +95,7 @@ async def login_project_user(
     user = await get_user_by_email(db, login_data.email, project_id=project.id)
     
     # Validate user and password
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await verify_password_cached(user.id, login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password for this project",
@@ -102,10 +109,14 @@ async def login_project_user(
             detail="User is inactive in this project",
         )
     
+    if needs_rehash(user.hashed_password):
+        # Upgrade the stored hash to the configured bcrypt cost
+        new_hash = await hash_password_async(login_data.password)
+        await update_user_password(db, user, new_hash)
+    
     # Create JWT tokens (Access and Refresh)
     # Subject is the globally unique user ID
-    access_token = create_access_token(subject=user.id)
-    refresh_token = create_refresh_token(subject=user.id)
+    access_token, refresh_token = create_token_pair(subject=user.id)
     
     # Get User-Agent for storing refresh token context
     user_agent = request.headers.get("user-agent")
@@ -115,7 +126,7 @@ async def login_project_user(
         db=db,
         user_id=user.id,
         token=refresh_token,
-        expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS), # Use config for duration
+        expires_delta=_REFRESH_TTL, # Use config for duration
         user_agent=user_agent,
         # project_id=project.id # Optional: Add project_id if RefreshToken model is scoped
     )
@@ -130,19 +141,21 @@ async def login_project_user(
 @router.post("/refresh", response_model=Token)
 async def refresh_client_token(
     refresh_data: TokenRefresh, # Get refresh token from body
-    project: Annotated[Project, Depends(validate_api_key)], # Validate API Key for context
+    project: Annotated[ApiKeyProject, Depends(validate_api_key)], # Validate API Key for context
     db: AsyncSession = Depends(get_db)
 ) -> Token:
     """Get a new access token using a refresh token for a project end-user."""
     token = refresh_data.refresh_token
 
-    # Check if the refresh token exists and is valid in DB
-    db_refresh_token = await get_refresh_token(db, token)
-    if not db_refresh_token:
+    # Check if the refresh token exists and is valid in DB, loading its user
+    # in the same query
+    token_with_user = await get_refresh_token_with_user(db, token)
+    if not token_with_user:
          raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token",
         )
+    db_refresh_token, user = token_with_user
 
     # Decode the refresh token to verify type and get user ID
     try:
@@ -150,7 +163,7 @@ async def refresh_client_token(
              raise HTTPException(status_code=401, detail="Invalid token type")
         payload = decode_token(token) # This also checks expiry
         user_id = payload.get("sub")
-        if not user_id:
+        if not user_id or user_id != db_refresh_token.user_id:
             raise HTTPException(status_code=401, detail="Invalid token payload")
     except HTTPException as e:
         # If decode fails (expired, invalid), revoke from DB and raise
@@ -160,9 +173,8 @@ async def refresh_client_token(
             detail=f"Refresh token invalid: {e.detail}"
         ) from e
 
-    # Get the user associated with the token
-    user = await get_user_by_id(db, user_id)
-    if not user or not user.is_active:
+    # Check the user loaded with the token
+    if not user.is_active:
          raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
@@ -187,35 +199,43 @@ async def refresh_client_token(
 
 @router.get("/user", response_model=UserRead)
 async def get_client_user_info(
+    request: Request,
     current_user: Annotated[User, Depends(get_current_client_user)] # Use JWT dependency
-) -> UserRead:
+) -> Response:
     """Get the current authenticated end-user's information."""
     # The dependency already validated the token and fetched the user
-    return UserRead.model_validate(current_user)
+    etag = version_etag(current_user.id, current_user.created_at, current_user.updated_at)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    key = (current_user.id, current_user.updated_at)
+    body = _user_info_cache.get(key)
+    if body is None:
+        body = orjson.dumps(user_read_from_orm(current_user).model_dump())
+        _user_info_cache[key] = body
+    # Returned as-is, FastAPI skips response_model validation and encoding
+    return json_with_etag(etag, body)
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout_client_user(
     refresh_data: TokenRefresh, # Get refresh token from body
-    project: Annotated[Project, Depends(validate_api_key)], # Validate API Key for context
+    project: Annotated[ApiKeyProject, Depends(validate_api_key)], # Validate API Key for context
     db: AsyncSession = Depends(get_db)
 ) -> None:
     """Logout end-user by revoking the provided refresh token within the project context."""
     token_to_revoke = refresh_data.refresh_token
     
-    # Optional: Decode token to verify user belongs to project before revoking
-    try:
-        payload = decode_token(token_to_revoke) # Check expiry/validity first
-        user_id = payload.get("sub")
-        if not user_id:
-             raise HTTPException(status_code=400, detail="Invalid token payload")
-        
-        user = await get_user_by_id(db, user_id)
-        if not user or user.project_id != project.id:
-             raise HTTPException(status_code=403, detail="Token does not belong to this project")
-    except HTTPException:
-        # Ignore decoding errors - if token is invalid/expired, just proceed
-        # as it might already be invalid in DB or doesn't matter.
-        pass 
+    # Verify the user behind the token belongs to the project before revoking,
+    # token and user come back from a single query. Unknown/expired tokens
+    # are simply ignored, they are already unusable.
+    token_with_user = await get_refresh_token_with_user(db, token_to_revoke)
+    if not token_with_user:
+        return None
+    _, user = token_with_user
+    if user.project_id != project.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token does not belong to this project"
+        )
         
     # Attempt to revoke the token from the database
     # revoke_refresh_token handles the case where the token doesn't exist gracefully
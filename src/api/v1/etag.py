@@ -0,0 +1,40 @@
+from datetime import datetime
+from hashlib import blake2b
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Short enough to absorb polling bursts, the token still gets checked on
+# every revalidation
+CACHE_CONTROL = "private, max-age=5"
+
+def version_etag(obj_id: str, created_at: datetime, updated_at: Optional[datetime]) -> str:
+    """Weak ETag of a row whose representation only depends on its own columns."""
+    version = updated_at or created_at
+    return f'W/"{obj_id}-{int(version.timestamp() * 1_000_000)}"'
+
+def body_etag(body: bytes) -> str:
+    """Weak ETag of an already serialized body (e.g. one including relationships)."""
+    return f'W/"{blake2b(body, digest_size=16).hexdigest()}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def json_with_etag(etag: str, body: bytes) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+def conditional_json(request: Request, etag: str, body: bytes) -> Response:
+    """Return a 304 if the client already holds `etag`, the JSON body otherwise."""
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return json_with_etag(etag, body)
@@ -0,0 +1,11 @@
+from typing import Annotated, Optional
+
+from fastapi import Path, Query
+
+# Ids are generated with str(uuid.uuid4()): anything else can't match a row,
+# so it is rejected with a 422 at routing time instead of costing a query
+_UUID_PATTERN = r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+
+ResourceId = Annotated[str, Path(pattern=_UUID_PATTERN)]
+# Keyset pagination cursor: the id of the last item of the previous page
+CursorId = Annotated[Optional[str], Query(pattern=_UUID_PATTERN)]
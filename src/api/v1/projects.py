@@ -1,17 +1,22 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from typing import List, Dict, Literal
+from pydantic import TypeAdapter
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.database import get_db
-from src.core.dependencies.auth import get_current_user
+from src.core.database import get_db, get_async_session_factory
+from src.core.dependencies.auth import get_current_user, get_current_principal, TokenPrincipal
+from src.core.dependencies.project_auth import invalidate_project_api_keys
 from src.core.crud.project import (
     create_project,
     get_project,
+    get_project_with_members,
+    is_project_owner,
     get_user_projects,
     update_project,
     delete_project,
     add_project_member,
-    get_project_members,
+    add_project_members_bulk,
     remove_project_member,
     update_project_member_role
 )
@@ -21,65 +26,118 @@ from src.schemas.project import (
     ProjectCreate,
     ProjectUpdate,
     ProjectList,
+    ProjectCreated,
     ProjectMember,
     ProjectMemberCreate
 )
-from src.schemas.api_key import ProjectApiKey, ProjectApiKeyCreate
+from src.schemas.api_key import ProjectApiKey, ProjectApiKeyCreate, ProjectApiKeyCreated, ProjectApiKeyList
 from src.models.user import User
+from src.api.v1.params import ResourceId, CursorId
+from src.api.v1.etag import body_etag, conditional_json
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
-@router.post("", response_model=Project)
+# List validators built once, pydantic-core then validates and dumps whole
+# lists in one call. Listing routes return the JSON bytes directly, so
+# FastAPI doesn't validate the items a second time against response_model.
+_PROJECTS_ADAPTER = TypeAdapter(List[Project])
+_KEYS_ADAPTER = TypeAdapter(List[ProjectApiKey])
+_MEMBERS_ADAPTER = TypeAdapter(List[ProjectMember])
+_KEY_ADAPTER = TypeAdapter(ProjectApiKey)
+
+def _require_project_owner(status_code: int, detail: str):
+    """
+    Build a route dependency checking that the authenticated user owns the
+    {project_id} of the path and is still active. It shares the route's
+    get_db session and runs a single SELECT projects.id ... JOIN users
+    query, so a deactivated owner is rejected even on routes that only
+    read the token. Nothing is returned: the handlers only need the
+    project id they already have.
+    """
+    async def check_owner(
+        project_id: ResourceId,
+        principal: TokenPrincipal = Depends(get_current_principal),
+        db: AsyncSession = Depends(get_db)
+    ) -> None:
+        if not await is_project_owner(db, project_id, principal.id):
+            raise HTTPException(status_code=status_code, detail=detail)
+    return check_owner
+
+_owns_project = _require_project_owner(
+    status.HTTP_404_NOT_FOUND, "Project not found or not owned by user"
+)
+_can_add_members = _require_project_owner(
+    status.HTTP_403_FORBIDDEN, "Not authorized to add members to this project"
+)
+_can_remove_members = _require_project_owner(
+    status.HTTP_403_FORBIDDEN, "Not authorized to remove members from this project"
+)
+_can_update_roles = _require_project_owner(
+    status.HTTP_403_FORBIDDEN, "Not authorized to update member roles in this project"
+)
+
+@router.post("", response_model=ProjectCreated)
 async def create_user_project(
     project_data: ProjectCreate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
-) -> Project:
-    """Create a new project for the current user."""
-    db_project = await create_project(
+) -> ProjectCreated:
+    """Create a new project for the current user, with the raw value of its initial API key."""
+    db_project, raw_key = await create_project(
         db=db,
         project_data=project_data,
         owner_id=current_user.id
     )
-    return Project.model_validate(db_project)
+    return ProjectCreated(**Project.model_validate(db_project).model_dump(), api_key=raw_key)
 
 @router.get("", response_model=ProjectList)
 async def list_user_projects(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: CursorId = None,
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
-) -> ProjectList:
-    """List all projects owned by the current user."""
-    projects = await get_user_projects(
+) -> Response:
+    """
+    List the projects owned by the current user, newest first.
+    Keyset-paginated: next_cursor is the `cursor` of the following page.
+    """
+    projects, total, next_cursor = await get_user_projects(
         db=db,
         owner_id=current_user.id,
-        skip=skip,
-        limit=limit
+        limit=limit,
+        after_id=cursor
     )
-    return ProjectList(
-        total=len(projects),
-        items=[Project.model_validate(p) for p in projects]
+    project_list = ProjectList(
+        total=total,
+        items=_PROJECTS_ADAPTER.validate_python(projects, from_attributes=True),
+        next_cursor=next_cursor
     )
+    return Response(content=project_list.model_dump_json(), media_type="application/json")
 
 @router.get("/{project_id}", response_model=Project)
 async def get_user_project(
-    project_id: str,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    project_id: ResourceId,
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
-) -> Project:
-    """Get a specific project owned by the current user."""
+) -> Response:
+    """
+    Get a specific project owned by the current user. The body embeds the
+    api keys and members, so the ETag is a digest of the body rather than
+    of projects.updated_at.
+    """
     db_project = await get_project(db, project_id, current_user.id)
     if not db_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found or not owned by user"
         )
-    return Project.model_validate(db_project)
+    body = Project.model_validate(db_project).model_dump_json().encode()
+    return conditional_json(request, body_etag(body), body)
 
 @router.put("/{project_id}", response_model=Project)
 async def update_user_project(
-    project_id: str,
+    project_id: ResourceId,
     project_data: ProjectUpdate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -96,11 +154,12 @@ async def update_user_project(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found or not owned by user"
         )
+    invalidate_project_api_keys(project_id)
     return Project.model_validate(db_project)
 
 @router.delete("/{project_id}", response_model=Dict[str, str])
 async def delete_user_project(
-    project_id: str,
+    project_id: ResourceId,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, str]:
@@ -115,98 +174,96 @@ async def delete_user_project(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found or not owned by user"
         )
+    invalidate_project_api_keys(project_id)
     return {"detail": "Project successfully deleted"}
 
 # Routes pour la gestion des membres du projet
 
-@router.post("/{project_id}/api-keys", response_model=ProjectApiKey, status_code=status.HTTP_201_CREATED)
+@router.post("/{project_id}/api-keys", response_model=ProjectApiKeyCreated, status_code=status.HTTP_201_CREATED, dependencies=[Depends(_owns_project)])
 async def create_project_api_key(
-    project_id: str,
+    project_id: ResourceId,
     key_data: ProjectApiKeyCreate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
-) -> ProjectApiKey:
-    """Create a new API key for a project owned by the current user."""
-    project = await get_project(db, project_id, owner_id=current_user.id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found or not owned by user"
-        )
-    
-    db_key = await api_key_crud.create_api_key(
+) -> ProjectApiKeyCreated:
+    """
+    Create a new API key for a project owned by the current user.
+    The response is the only one carrying the full key.
+    """
+    db_key, raw_key = await api_key_crud.create_api_key(
         db=db,
-        project_id=project.id,
+        project_id=project_id,
         name=key_data.name
     )
-    return ProjectApiKey.model_validate(db_key)
+    return ProjectApiKeyCreated(**ProjectApiKey.model_validate(db_key).model_dump(), key=raw_key)
 
-@router.get("/{project_id}/api-keys", response_model=List[ProjectApiKey])
+@router.get("/{project_id}/api-keys", response_model=ProjectApiKeyList, dependencies=[Depends(_owns_project)])
 async def list_project_api_keys(
-    project_id: str,
+    project_id: ResourceId,
     include_inactive: bool = False,
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: CursorId = None,
     db: AsyncSession = Depends(get_db)
-) -> List[ProjectApiKey]:
-    """List API keys for a project owned by the current user."""
-    project = await get_project(db, project_id, owner_id=current_user.id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found or not owned by user"
-        )
-        
+) -> Response:
+    """
+    List API keys for a project owned by the current user.
+    Keyset-paginated: next_cursor is the `cursor` of the following page.
+    """
+    # One extra row tells whether another page follows, it isn't returned
     db_keys = await api_key_crud.get_project_api_keys(
-        db, project_id, include_inactive
+        db, project_id, include_inactive, limit=limit + 1, after_id=cursor
+    )
+    page = db_keys[:limit]
+    key_list = ProjectApiKeyList(
+        items=_KEYS_ADAPTER.validate_python(page, from_attributes=True),
+        next_cursor=page[-1].id if len(db_keys) > limit else None
     )
-    return [ProjectApiKey.model_validate(key) for key in db_keys]
+    return Response(content=key_list.model_dump_json(), media_type="application/json")
+
+@router.get("/{project_id}/api-keys/export", dependencies=[Depends(_owns_project)])
+async def export_project_api_keys(
+    project_id: ResourceId,
+    include_inactive: bool = False
+) -> StreamingResponse:
+    """
+    Export every API key of a project owned by the current user as NDJSON.
+    Rows are streamed from the database and written one line at a time, so
+    memory doesn't grow with the number of keys.
+    """
+    # The body is sent after the request's dependencies have been torn down,
+    # so the stream gets its own session, like the background tasks
+    session_factory = get_async_session_factory()
+
+    async def ndjson_lines():
+        async with session_factory() as db:
+            async for db_key in api_key_crud.stream_project_api_keys(db, project_id, include_inactive):
+                key = _KEY_ADAPTER.validate_python(db_key, from_attributes=True)
+                yield _KEY_ADAPTER.dump_json(key) + b"\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
 @router.delete("/{project_id}/api-keys/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def deactivate_project_api_key(
-    project_id: str,
-    key_id: str,
-    current_user: User = Depends(get_current_user),
+    project_id: ResourceId,
+    key_id: ResourceId,
+    principal: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ) -> None:
-    """Deactivate an API key for a project owned by the current user."""
-    project = await get_project(db, project_id, owner_id=current_user.id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found or not owned by user"
-        )
-        
-    success = await api_key_crud.deactivate_api_key(db, key_id)
+    """Deactivate an active API key for a project owned by the current user."""
+    success = await api_key_crud.deactivate_api_key(db, key_id, project_id, principal.id)
     if not success:
         raise HTTPException(status_code=404, detail="API key not found")
+    invalidate_project_api_keys(project_id)
     return None
 
-# Helper function to check project access (owner or member)
-async def check_project_access(db: AsyncSession, project_id: str, user_id: str) -> bool:
-    project = await get_project(db, project_id)
-    if not project:
-        return False
-    if project.owner_id == user_id:
-        return True
-    if not any(m.user_id == user_id for m in project.members):
-        return False
-    return True
-
-@router.post("/{project_id}/members", response_model=ProjectMember)
+@router.post("/{project_id}/members", response_model=ProjectMember, dependencies=[Depends(_can_add_members)])
 async def add_member_to_project(
-    project_id: str,
+    project_id: ResourceId,
     member_data: ProjectMemberCreate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> ProjectMember:
     """Add a new member to a project. Requires project ownership."""
-    project = await get_project(db, project_id, owner_id=current_user.id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to add members to this project"
-        )
-
     db_member = await add_project_member(
         db=db,
         project_id=project_id,
@@ -219,14 +276,34 @@ async def add_member_to_project(
         )
     return ProjectMember.model_validate(db_member)
 
-@router.get("/{project_id}/members", response_model=List[ProjectMember])
-async def list_project_members(
-    project_id: str,
+@router.post("/{project_id}/members/bulk", response_model=List[ProjectMember], dependencies=[Depends(_can_add_members)])
+async def add_members_to_project(
+    project_id: ResourceId,
+    # Bounded so one request can't turn into an unbounded INSERT
+    members_data: List[ProjectMemberCreate] = Body(..., max_length=100),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> List[ProjectMember]:
+    """
+    Add several members to a project in one request. Requires project ownership.
+    Unknown users and existing members are skipped, only the added members are returned.
+    """
+    db_members = await add_project_members_bulk(
+        db=db,
+        project_id=project_id,
+        members_data=members_data,
+    )
+    return _MEMBERS_ADAPTER.validate_python(db_members, from_attributes=True)
+
+@router.get("/{project_id}/members", response_model=List[ProjectMember])
+async def list_project_members(
+    project_id: ResourceId,
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
     """List all members of a project. Requires ownership or membership."""
-    project = await get_project(db, project_id)
+    # The members loaded for the access check are the ones returned
+    project = await get_project_with_members(db, project_id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
     
@@ -239,25 +316,20 @@ async def list_project_members(
             detail="Not authorized to view members of this project"
         )
     
-    members = await get_project_members(db, project_id)
-    return [ProjectMember.model_validate(m) for m in members]
+    return Response(
+        content=_MEMBERS_ADAPTER.dump_json(_MEMBERS_ADAPTER.validate_python(project.members, from_attributes=True)),
+        media_type="application/json"
+    )
 
-@router.delete("/{project_id}/members/{user_id}", response_model=Dict[str, str])
+@router.delete("/{project_id}/members/{user_id}", response_model=Dict[str, str], dependencies=[Depends(_can_remove_members)])
 async def remove_member_from_project(
-    project_id: str,
-    user_id: str,
+    project_id: ResourceId,
+    user_id: ResourceId,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, str]:
     """Remove a member from a project. Requires project ownership."""
-    project = await get_project(db, project_id, owner_id=current_user.id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to remove members from this project"
-        )
-    
-    if project.owner_id == user_id:
+    if current_user.id == user_id:
          raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot remove project owner as a member"
@@ -275,33 +347,20 @@ async def remove_member_from_project(
         )
     return {"detail": "Member successfully removed"}
 
-@router.put("/{project_id}/members/{user_id}/role", response_model=ProjectMember)
+@router.put("/{project_id}/members/{user_id}/role", response_model=ProjectMember, dependencies=[Depends(_can_update_roles)])
 async def update_member_role(
-    project_id: str,
-    user_id: str,
-    role: str,
+    project_id: ResourceId,
+    user_id: ResourceId,
+    role: Literal["member", "admin"],
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> ProjectMember:
     """Update a member's role in a project. Requires project ownership."""
-    project = await get_project(db, project_id, owner_id=current_user.id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update member roles in this project"
-        )
-        
-    if project.owner_id == user_id:
+    if current_user.id == user_id:
          raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot change project owner's role"
         )
-
-    if role not in ["member", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid role. Must be 'member' or 'admin'"
-        )
     
     db_member = await update_project_member_role(
         db=db,
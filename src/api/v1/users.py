@@ -1,22 +1,28 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_db
 from src.core.dependencies.auth import get_current_user
 from src.core.crud.user import get_user_by_id, update_user, update_user_password
-from src.core.security.password import hash_password, verify_password, is_password_strong
-from src.schemas.user import UserRead, UserUpdate
+from src.core.security.password import hash_password_async, verify_password_async, is_password_strong
+from src.schemas.user import UserRead, UserUpdate, user_read_from_orm
 from src.models.user import User
+from src.api.v1.params import ResourceId
+from src.api.v1.etag import version_etag, is_not_modified, not_modified, json_with_etag
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserRead)
 async def get_current_user_info(
+    request: Request,
     current_user: User = Depends(get_current_user)
-) -> UserRead:
-    """Get current user information."""
-    return UserRead.model_validate(current_user)
+) -> Response:
+    """Get current user information, 304 if the client's ETag is still current."""
+    etag = version_etag(current_user.id, current_user.created_at, current_user.updated_at)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return json_with_etag(etag, user_read_from_orm(current_user).model_dump_json().encode())
 
 @router.put("/me", response_model=UserRead)
 async def update_current_user(
@@ -33,8 +39,8 @@ async def update_current_user(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Password is not strong enough"
             )
-        # Mettre à jour le mot de passe
-        hashed_password = hash_password(user_data.password)
+        # Mettre à jour le mot de passe (bcrypt dans le pool dédié, hors de la boucle)
+        hashed_password = await hash_password_async(user_data.password)
         await update_user_password(db, current_user, hashed_password)
         
         # Supprimer le mot de passe du dict de mise à jour
@@ -42,11 +48,11 @@ async def update_current_user(
     
     # Mettre à jour les autres informations
     updated_user = await update_user(db, current_user, user_data)
-    return UserRead.model_validate(updated_user)
+    return user_read_from_orm(updated_user)
 
 @router.get("/{user_id}", response_model=UserRead)
 async def get_user_info(
-    user_id: str,
+    user_id: ResourceId,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> UserRead:
@@ -57,7 +63,7 @@ async def get_user_info(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return UserRead.model_validate(user)
+    return user_read_from_orm(user)
 
 @router.post("/me/change-password")
 async def change_password(
@@ -68,7 +74,7 @@ async def change_password(
 ):
     """Change user password."""
     # Vérifier le mot de passe actuel
-    if not verify_password(current_password, current_user.hashed_password):
+    if not await verify_password_async(current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
@@ -88,8 +94,8 @@ async def change_password(
             detail="New password is not strong enough"
         )
     
-    # Mettre à jour le mot de passe
-    hashed_password = hash_password(new_password)
+    # Mettre à jour le mot de passe (bcrypt dans le pool dédié, hors de la boucle)
+    hashed_password = await hash_password_async(new_password)
     await update_user_password(db, current_user, hashed_password)
     
     return {"detail": "Password successfully updated"} 
\ No newline at end of file
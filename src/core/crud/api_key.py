@@ -1,93 +1,211 @@
-from typing import Optional, List
+import asyncio
+import logging
+import time
+from typing import Optional, List, AsyncIterator, Callable, Dict, Tuple
 from datetime import datetime, UTC
-from sqlalchemy import select, update
+from sqlalchemy import select, update, values, column, bindparam, String, DateTime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, load_only, raiseload
 
 from src.models.project import ProjectApiKey, Project
-from src.core.security.tokens import generate_project_api_key
+from src.models.user import User
+from src.core.security.tokens import (
+    generate_project_api_key,
+    hash_project_api_key,
+    API_KEY_PREFIX_LENGTH
+)
 
-async def create_api_key(
-    db: AsyncSession,
-    project_id: str,
-    name: str
-) -> ProjectApiKey:
-    """Create a new API key for a project."""
+logger = logging.getLogger(__name__)
+
+# Single joined query, both the key and its project must be active. Callers
+# only keep the project's id and name, the other columns stay unloaded.
+# Built once and re-executed with a bound key hash.
+_SELECT_ACTIVE_KEY_PROJECT = (
+    select(Project, ProjectApiKey.id)
+    .options(load_only(Project.id, Project.name), raiseload("*"))
+    .join(ProjectApiKey, ProjectApiKey.project_id == Project.id)
+    .where(
+        ProjectApiKey.key_hash == bindparam("key_hash"),
+        ProjectApiKey.is_active == True,
+        Project.is_active == True
+    )
+)
+
+def new_api_key(name: str, project_id: Optional[str] = None) -> Tuple[ProjectApiKey, str]:
+    """
+    Build an unsaved API key and return it with the raw key. Only the hash
+    is stored, so the raw key must be handed to the caller now or never.
+    """
+    raw_key = generate_project_api_key()
     api_key = ProjectApiKey(
         project_id=project_id,
-        key=generate_project_api_key(),
+        key_hash=hash_project_api_key(raw_key),
+        key_prefix=raw_key[:API_KEY_PREFIX_LENGTH],
         name=name
     )
+    return api_key, raw_key
+
+async def create_api_key(
+    db: AsyncSession,
+    project_id: str,
+    name: str
+) -> Tuple[ProjectApiKey, str]:
+    """Create a new API key for a project, returns the key row and the raw key."""
+    api_key, raw_key = new_api_key(name, project_id)
     db.add(api_key)
     await db.commit()
-    await db.refresh(api_key)
-    return api_key
+    return api_key, raw_key
 
 async def get_project_api_keys(
     db: AsyncSession,
     project_id: str,
-    include_inactive: bool = False
+    include_inactive: bool = False,
+    limit: Optional[int] = None,
+    after_id: Optional[str] = None
 ) -> List[ProjectApiKey]:
-    """Get all API keys for a project."""
-    query = select(ProjectApiKey).where(ProjectApiKey.project_id == project_id)
+    """
+    Get the API keys of a project, ordered by id.
+    With limit/after_id, returns one keyset page: the keys whose id is
+    greater than after_id.
+    """
+    query = (
+        select(ProjectApiKey)
+        .options(raiseload("*"))
+        .where(ProjectApiKey.project_id == project_id)
+    )
     if not include_inactive:
         query = query.where(ProjectApiKey.is_active == True)
+    if after_id is not None:
+        query = query.where(ProjectApiKey.id > after_id)
+    query = query.order_by(ProjectApiKey.id)
+    if limit is not None:
+        query = query.limit(limit)
     result = await db.execute(query)
     return list(result.scalars().all())
 
+async def stream_project_api_keys(
+    db: AsyncSession,
+    project_id: str,
+    include_inactive: bool = False
+) -> AsyncIterator[ProjectApiKey]:
+    """Yield all API keys of a project, fetched from a server-side cursor in batches."""
+    query = (
+        select(ProjectApiKey)
+        .options(raiseload("*"))
+        .where(ProjectApiKey.project_id == project_id)
+        .order_by(ProjectApiKey.id)
+        .execution_options(yield_per=500)
+    )
+    if not include_inactive:
+        query = query.where(ProjectApiKey.is_active == True)
+    result = await db.stream_scalars(query)
+    async for api_key in result:
+        yield api_key
+
 async def get_api_key(
     db: AsyncSession,
     key: str,
     load_project: bool = False
 ) -> Optional[ProjectApiKey]:
     """Get an API key by its value."""
-    query = select(ProjectApiKey).where(ProjectApiKey.key == key)
+    query = select(ProjectApiKey).where(ProjectApiKey.key_hash == hash_project_api_key(key))
     if load_project:
         query = query.options(selectinload(ProjectApiKey.project))
+    query = query.options(raiseload("*"))
     result = await db.execute(query)
     return result.scalar_one_or_none()
 
 async def validate_project_api_key(
     db: AsyncSession,
     key: str
-) -> Optional[Project]:
-    """Validate a project API key and return the associated Project if active."""
-    api_key_obj = await get_api_key(db, key, load_project=True)
-    if not api_key_obj:
-        return None
-    if not api_key_obj.is_active:
-        return None
-    if not api_key_obj.project:
-        return None
-    if not api_key_obj.project.is_active:
+) -> Optional[Tuple[Project, str]]:
+    """Validate a project API key and return the associated Project and the key id if active."""
+    result = await db.execute(
+        _SELECT_ACTIVE_KEY_PROJECT, {"key_hash": hash_project_api_key(key)}
+    )
+    row = result.first()
+    if not row:
         return None
-    
-    return api_key_obj.project
+    return row[0], row[1]
 
 async def deactivate_api_key(
     db: AsyncSession,
-    key_id: str
+    key_id: str,
+    project_id: str,
+    owner_id: str
 ) -> bool:
-    """Deactivate an API key."""
+    """
+    Deactivate an active API key of a project owned by owner_id, an active
+    user. Ownership is checked by the same UPDATE ... FROM projects, users
+    statement, so an unknown, foreign or already inactive key, or a
+    deactivated owner, simply matches no row.
+    """
     query = update(ProjectApiKey).where(
-        ProjectApiKey.id == key_id
+        ProjectApiKey.id == key_id,
+        ProjectApiKey.project_id == project_id,
+        ProjectApiKey.is_active.is_(True),
+        ProjectApiKey.project_id == Project.id,
+        Project.owner_id == owner_id,
+        User.id == Project.owner_id,
+        User.is_active.is_(True)
     ).values(
         is_active=False
-    )
+    ).returning(ProjectApiKey.id)
     result = await db.execute(query)
+    deactivated = result.scalar_one_or_none() is not None
     await db.commit()
-    return result.rowcount > 0
+    return deactivated
 
-async def update_api_key_last_used(
-    db: AsyncSession,
-    key: str
-) -> bool:
-    """Update the last_used_at timestamp of an API key."""
+# last_used_at values not written yet, one epoch timestamp per key id: a key
+# used many times between two flushes costs a single row in the next UPDATE.
+# Plain floats keep the per-request cost down, datetimes are built at flush.
+_pending_last_used: Dict[str, float] = {}
+
+def record_api_key_use(key_id: str) -> None:
+    """Note that an API key was just used, flush_api_key_last_used writes it later."""
+    _pending_last_used[key_id] = time.time()
+
+async def flush_api_key_last_used(db: AsyncSession) -> int:
+    """Write the pending last_used_at values with a single UPDATE ... FROM (VALUES ...)."""
+    if not _pending_last_used:
+        return 0
+    batch = [
+        (key_id, datetime.fromtimestamp(used_at, UTC))
+        for key_id, used_at in _pending_last_used.items()
+    ]
+    _pending_last_used.clear()
+    used = values(
+        column("id", String(36)),
+        column("used_at", DateTime(timezone=True)),
+        name="used"
+    ).data(batch)
     query = update(ProjectApiKey).where(
-        ProjectApiKey.key == key
+        ProjectApiKey.id == used.c.id
     ).values(
-        last_used_at=datetime.now(UTC)
+        last_used_at=used.c.used_at
     )
     result = await db.execute(query)
     await db.commit()
-    return result.rowcount > 0 
\ No newline at end of file
+    return result.rowcount
+
+async def write_api_key_usage_periodically(
+    session_factory: Callable[[], AsyncSession],
+    interval: float
+) -> None:
+    """Flush the recorded API key uses every `interval` seconds, until cancelled."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as db:
+                    await flush_api_key_last_used(db)
+            except Exception:
+                # The timestamps of this batch are lost, the next uses record them again
+                logger.exception("Failed to write API key usage")
+    finally:
+        # Last flush on shutdown, a failure here mustn't mask the cancellation
+        try:
+            async with session_factory() as db:
+                await flush_api_key_last_used(db)
+        except Exception:
+            logger.exception("Failed to write API key usage on shutdown")
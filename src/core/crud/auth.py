@@ -1,9 +1,32 @@
+import asyncio
+import hashlib
+import logging
 from datetime import datetime, timedelta, UTC
-from typing import Optional
-from sqlalchemy import select, and_, or_
+from typing import Callable, Optional, Tuple
+from sqlalchemy import select, update, delete, and_, or_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.user import RefreshToken
+from src.models.user import RefreshToken, User
+
+logger = logging.getLogger(__name__)
+
+def _token_hash(token: str) -> bytes:
+    """Digest under which a refresh token is stored and looked up."""
+    return hashlib.sha256(token.encode()).digest()
+
+# Lookups of a valid (not revoked, not expired) refresh token, built once and
+# re-executed with bound parameters
+_VALID_REFRESH_TOKEN = and_(
+    RefreshToken.token_hash == bindparam("token_hash"),
+    RefreshToken.is_revoked == False,
+    RefreshToken.expires_at > bindparam("now")
+)
+_SELECT_REFRESH_TOKEN = select(RefreshToken).where(_VALID_REFRESH_TOKEN)
+_SELECT_REFRESH_TOKEN_WITH_USER = (
+    select(RefreshToken, User)
+    .join(User, RefreshToken.user_id == User.id)
+    .where(_VALID_REFRESH_TOKEN)
+)
 
 async def create_refresh_token(
     db: AsyncSession,
@@ -15,7 +38,7 @@ async def create_refresh_token(
     """Create a new refresh token."""
     db_token = RefreshToken(
         user_id=user_id,
-        token=token,
+        token_hash=_token_hash(token),
         expires_at=datetime.now(UTC) + expires_delta,
         user_agent=user_agent
     )
@@ -29,31 +52,43 @@ async def get_refresh_token(
     token: str
 ) -> Optional[RefreshToken]:
     """Get a refresh token by its value."""
-    query = (
-        select(RefreshToken)
-        .where(
-            and_(
-                RefreshToken.token == token,
-                RefreshToken.is_revoked == False,
-                RefreshToken.expires_at > datetime.now(UTC)
-            )
-        )
+    result = await db.execute(
+        _SELECT_REFRESH_TOKEN, {"token_hash": _token_hash(token), "now": datetime.now(UTC)}
     )
-    result = await db.execute(query)
     return result.scalar_one_or_none()
 
+async def get_refresh_token_with_user(
+    db: AsyncSession,
+    token: str
+) -> Optional[Tuple[RefreshToken, User]]:
+    """Get a valid refresh token and the user it belongs to in a single query."""
+    result = await db.execute(
+        _SELECT_REFRESH_TOKEN_WITH_USER,
+        {"token_hash": _token_hash(token), "now": datetime.now(UTC)}
+    )
+    row = result.first()
+    if not row:
+        return None
+    return row[0], row[1]
+
 async def revoke_refresh_token(
     db: AsyncSession,
     token: str
 ) -> bool:
     """Revoke a refresh token."""
-    db_token = await get_refresh_token(db, token)
-    if not db_token:
-        return False
-    
-    db_token.is_revoked = True
+    # Single UPDATE, the WHERE clause applies the same checks as get_refresh_token
+    query = update(RefreshToken).where(
+        and_(
+            RefreshToken.token_hash == _token_hash(token),
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.now(UTC)
+        )
+    ).values(
+        is_revoked=True
+    )
+    result = await db.execute(query)
     await db.commit()
-    return True
+    return result.rowcount > 0
 
 async def revoke_user_refresh_tokens(
     db: AsyncSession,
@@ -61,7 +96,7 @@ async def revoke_user_refresh_tokens(
     exclude_token: Optional[str] = None
 ) -> int:
     """Revoke all refresh tokens for a user."""
-    query = select(RefreshToken).where(
+    query = update(RefreshToken).where(
         and_(
             RefreshToken.user_id == user_id,
             RefreshToken.is_revoked == False
@@ -69,32 +104,37 @@ async def revoke_user_refresh_tokens(
     )
     
     if exclude_token:
-        query = query.where(RefreshToken.token != exclude_token)
-    
-    result = await db.execute(query)
-    tokens = result.scalars().all()
-    
-    for token in tokens:
-        token.is_revoked = True
+        query = query.where(RefreshToken.token_hash != _token_hash(exclude_token))
     
+    result = await db.execute(query.values(is_revoked=True))
     await db.commit()
-    return len(tokens)
+    return result.rowcount
 
 async def cleanup_expired_tokens(
     db: AsyncSession
 ) -> int:
     """Delete expired or revoked refresh tokens."""
-    query = select(RefreshToken).where(
+    # Single bulk DELETE, the rows are never loaded into the session
+    query = delete(RefreshToken).where(
         or_(
             RefreshToken.expires_at <= datetime.now(UTC),
             RefreshToken.is_revoked == True
         )
     )
     result = await db.execute(query)
-    tokens = result.scalars().all()
-    
-    for token in tokens:
-        await db.delete(token)
-    
     await db.commit()
-    return len(tokens) 
\ No newline at end of file
+    return result.rowcount
+
+async def cleanup_expired_tokens_periodically(
+    session_factory: Callable[[], AsyncSession],
+    interval: float
+) -> None:
+    """Run cleanup_expired_tokens every `interval` seconds, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                await cleanup_expired_tokens(db)
+        except Exception:
+            # Nothing is lost, the next run deletes these rows
+            logger.exception("Failed to clean up refresh tokens")
@@ -1,56 +1,110 @@
-from typing import Optional, List
-from sqlalchemy import select, and_
+from datetime import datetime, UTC
+from typing import Optional, List, Tuple
+import uuid
+from sqlalchemy import select, and_, func, bindparam, delete, update, literal, tuple_, values, column, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, raiseload, aliased
 
-from src.models.project import Project, ProjectApiKey, ProjectMember
+from src.models.project import Project, ProjectMember
 from src.models.user import User
 from src.schemas.project import ProjectCreate, ProjectUpdate, ProjectMemberCreate, ProjectBase
-from src.core.security.tokens import generate_project_api_key
+from src.core.crud.api_key import new_api_key
+
+# Collections serialized by the Project schema, loaded with one
+# SELECT ... WHERE project_id IN (...) each, whatever the page size.
+# Project.owner isn't serialized anywhere, so it isn't loaded, and any
+# other relationship access raises instead of silently lazy loading (N+1).
+_PROJECT_COLLECTIONS = (
+    selectinload(Project.api_keys),
+    selectinload(Project.members),
+    raiseload("*"),
+)
+
+# Hot lookups built once and re-executed with bound parameters
+_SELECT_PROJECT = (
+    select(Project)
+    .options(*_PROJECT_COLLECTIONS)
+    .where(Project.id == bindparam("project_id"))
+)
+_SELECT_OWNED_PROJECT = _SELECT_PROJECT.where(Project.owner_id == bindparam("owner_id"))
+# The owner's is_active is checked in the same query, so routes guarded by
+# the token alone still turn away a deactivated owner
+_SELECT_OWNED_PROJECT_ID = (
+    select(Project.id)
+    .join(User, User.id == Project.owner_id)
+    .where(
+        Project.id == bindparam("project_id"),
+        Project.owner_id == bindparam("owner_id"),
+        User.is_active == True
+    )
+)
+# ProjectMember responses only carry user_id, the users aren't loaded
+_SELECT_PROJECT_MEMBERS = (
+    select(ProjectMember)
+    .options(raiseload("*"))
+    .where(ProjectMember.project_id == bindparam("project_id"))
+)
+_SELECT_PROJECT_WITH_MEMBERS = (
+    select(Project)
+    .options(selectinload(Project.members), raiseload("*"))
+    .where(Project.id == bindparam("project_id"))
+)
+# Project pages are keyset-paginated, newest first: a page starts right
+# after the (created_at, id) of the cursor project, so deep pages cost the
+# same index range scan as the first one instead of an OFFSET scan
+_PAGE_CURSOR = aliased(Project)
+_AFTER_CURSOR = tuple_(Project.created_at, Project.id) < tuple_(
+    select(_PAGE_CURSOR.created_at)
+    .where(_PAGE_CURSOR.id == bindparam("after_id"))
+    .scalar_subquery(),
+    bindparam("after_id")
+)
+_NEWEST_FIRST = (Project.created_at.desc(), Project.id.desc())
+
+def _projects_page(*criteria, total):
+    return (
+        select(Project, total.label("total"))
+        .options(*_PROJECT_COLLECTIONS)
+        .where(*criteria)
+        .order_by(*_NEWEST_FIRST)
+        .limit(bindparam("limit"))
+    )
+
+_COUNT_USER_PROJECTS = (
+    select(func.count())
+    .select_from(Project)
+    .where(Project.owner_id == bindparam("owner_id"))
+)
+# correlate(None): count the whole table, not the outer query's current row
+_USER_PROJECTS_TOTAL = _COUNT_USER_PROJECTS.correlate(None).scalar_subquery()
+_SELECT_USER_PROJECTS_FIRST_PAGE = _projects_page(
+    Project.owner_id == bindparam("owner_id"), total=_USER_PROJECTS_TOTAL
+)
+_SELECT_USER_PROJECTS_NEXT_PAGE = _projects_page(
+    Project.owner_id == bindparam("owner_id"), _AFTER_CURSOR, total=_USER_PROJECTS_TOTAL
+)
 
 async def create_project(
     db: AsyncSession,
     project_data: ProjectBase,
     owner_id: str,
     initial_api_key_name: str = "Default"
-) -> Project:
-    """Create a new project with an initial API key."""
-    # Create project
+) -> Tuple[Project, str]:
+    """Create a new project with an initial API key, returns the project and the raw key."""
+    # Project and key go in with a single flush; both collections are set
+    # up front, so the returned object is complete without a re-query
+    api_key, raw_key = new_api_key(initial_api_key_name)
     db_project = Project(
         name=project_data.name,
         description=project_data.description,
-        owner_id=owner_id
+        owner_id=owner_id,
+        api_keys=[api_key],
+        members=[]
     )
     db.add(db_project)
-    await db.flush()
-    
-    # Save the ID before commit
-    project_id = db_project.id
-    
-    # Create initial API key
-    api_key = ProjectApiKey(
-        project_id=project_id,
-        key=generate_project_api_key(),
-        name=initial_api_key_name
-    )
-    db.add(api_key)
-    
-    # Commit to save both project and API key
     await db.commit()
-    
-    # Re-query the project with eager loading to ensure all attributes are loaded
-    # Use the previously saved ID instead of accessing it from the expired object
-    query = (
-        select(Project)
-        .options(selectinload(Project.api_keys))
-        .options(selectinload(Project.owner))
-        .options(selectinload(Project.members))
-        .where(Project.id == project_id)
-    )
-    result = await db.execute(query)
-    db_project = result.scalar_one()
-    
-    return db_project
+    return db_project, raw_key
 
 async def get_project(
     db: AsyncSession,
@@ -58,55 +112,89 @@ async def get_project(
     owner_id: Optional[str] = None
 ) -> Optional[Project]:
     """Get a project by ID. If owner_id is provided, verify ownership."""
-    query = (
-        select(Project)
-        .options(selectinload(Project.api_keys))
-        .options(selectinload(Project.owner))
-        .options(selectinload(Project.members))
-        .where(Project.id == project_id)
-    )
-    
     if owner_id:
-        query = query.where(Project.owner_id == owner_id)
-    
-    result = await db.execute(query)
+        result = await db.execute(
+            _SELECT_OWNED_PROJECT, {"project_id": project_id, "owner_id": owner_id}
+        )
+    else:
+        result = await db.execute(_SELECT_PROJECT, {"project_id": project_id})
+    return result.scalar_one_or_none()
+
+async def is_project_owner(
+    db: AsyncSession,
+    project_id: str,
+    owner_id: str
+) -> bool:
+    """Check that a project exists and is owned by owner_id, an active user, without loading it."""
+    result = await db.execute(
+        _SELECT_OWNED_PROJECT_ID, {"project_id": project_id, "owner_id": owner_id}
+    )
+    return result.scalar_one_or_none() is not None
+
+async def get_project_with_members(
+    db: AsyncSession,
+    project_id: str
+) -> Optional[Project]:
+    """Get a project with only its members loaded, for membership checks and listings."""
+    result = await db.execute(_SELECT_PROJECT_WITH_MEMBERS, {"project_id": project_id})
     return result.scalar_one_or_none()
 
 async def get_user_projects(
     db: AsyncSession,
     owner_id: str,
-    skip: int = 0,
-    limit: int = 100
-) -> List[Project]:
-    """Get a list of projects for a specific user."""
-    query = (
-        select(Project)
-        .options(selectinload(Project.api_keys))
-        .options(selectinload(Project.owner))
-        .options(selectinload(Project.members))
-        .where(Project.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
+    limit: int = 100,
+    after_id: Optional[str] = None
+) -> Tuple[List[Project], int, Optional[str]]:
+    """
+    Get a page of the projects of a specific user, newest first, with the
+    user's total project count computed in the same query.
+    With after_id, the page starts after that project. Also returns the
+    after_id of the next page, None on the last one.
+    """
+    query = _SELECT_USER_PROJECTS_FIRST_PAGE if after_id is None else _SELECT_USER_PROJECTS_NEXT_PAGE
+    result = await db.execute(
+        query, {"owner_id": owner_id, "limit": limit + 1, "after_id": after_id}
+    )
+    return await _page_with_total(
+        db, result.all(), limit, _COUNT_USER_PROJECTS, {"owner_id": owner_id}
     )
-    result = await db.execute(query)
-    return list(result.scalars().all())
 
 async def get_projects(
     db: AsyncSession,
-    skip: int = 0,
-    limit: int = 100
-) -> List[Project]:
-    """Get a list of all projects."""
-    query = (
-        select(Project)
-        .options(selectinload(Project.api_keys))
-        .options(selectinload(Project.owner))
-        .options(selectinload(Project.members))
-        .offset(skip)
-        .limit(limit)
+    limit: int = 100,
+    after_id: Optional[str] = None
+) -> Tuple[List[Project], int, Optional[str]]:
+    """
+    Get a page of all projects, newest first, with the total project count
+    from the same query and the after_id of the next page.
+    """
+    count = select(func.count()).select_from(Project)
+    criteria = () if after_id is None else (_AFTER_CURSOR,)
+    result = await db.execute(
+        _projects_page(*criteria, total=count.correlate(None).scalar_subquery()),
+        {"limit": limit + 1, "after_id": after_id}
     )
-    result = await db.execute(query)
-    return list(result.scalars().all())
+    return await _page_with_total(db, result.all(), limit, count, {})
+
+async def _page_with_total(
+    db: AsyncSession,
+    rows,
+    limit: int,
+    count_query,
+    params: dict
+) -> Tuple[List[Project], int, Optional[str]]:
+    """
+    Split the limit + 1 rows of a page query into the page, the total and
+    the next cursor: the extra row only tells that another page follows.
+    """
+    if not rows:
+        # Past the last page, or a cursor whose project was deleted: no row
+        # carries the total, count it on its own
+        total = (await db.execute(count_query, params)).scalar_one()
+        return [], total, None
+    projects = [row.Project for row in rows[:limit]]
+    next_cursor = projects[-1].id if len(rows) > limit else None
+    return projects, rows[0].total, next_cursor
 
 async def update_project(
     db: AsyncSession,
@@ -118,9 +206,7 @@ async def update_project(
     # Get project with relationships
     query = (
         select(Project)
-        .options(selectinload(Project.api_keys))
-        .options(selectinload(Project.owner))
-        .options(selectinload(Project.members))
+        .options(*_PROJECT_COLLECTIONS)
         .where(Project.id == project_id)
     )
     
@@ -137,19 +223,10 @@ async def update_project(
     for field, value in project_data.model_dump(exclude_unset=True).items():
         setattr(project, field, value)
     
-    # Commit changes
+    # Commit changes. Sessions don't expire on commit and updated_at is set
+    # in Python, so the loaded instance is already up to date
     await db.commit()
-    
-    # Re-query to get a fresh instance with all relationships
-    query = (
-        select(Project)
-        .options(selectinload(Project.api_keys))
-        .options(selectinload(Project.owner))
-        .options(selectinload(Project.members))
-        .where(Project.id == project_id)
-    )
-    result = await db.execute(query)
-    return result.scalar_one()
+    return project
 
 async def delete_project(
     db: AsyncSession,
@@ -157,64 +234,102 @@ async def delete_project(
     owner_id: Optional[str] = None
 ) -> bool:
     """Delete a project. If owner_id is provided, verify ownership."""
-    project = await get_project(db, project_id, owner_id)
-    if not project:
-        return False
-    
-    await db.delete(project)
+    # Single DELETE ... RETURNING, the api keys and members go with it
+    # through the ON DELETE CASCADE foreign keys
+    query = delete(Project).where(Project.id == project_id)
+    if owner_id:
+        query = query.where(Project.owner_id == owner_id)
+    result = await db.execute(query.returning(Project.id))
+    deleted = result.scalar_one_or_none() is not None
     await db.commit()
-    return True
+    return deleted
 
 async def add_project_member(
     db: AsyncSession,
     project_id: str,
     member_data: ProjectMemberCreate
 ) -> Optional[ProjectMember]:
-    """Add a new member to a project. Assumes caller has verified ownership."""
-    # Vérifier que l'utilisateur existe
-    user_result = await db.execute(select(User).where(User.id == member_data.user_id))
-    user = user_result.scalar_one_or_none()
-    if not user:
-        # Indicate user not found specifically
-        # Raise exception or return a specific value? Returning None for now.
-        return None
-
-    # Vérifier si l'utilisateur est déjà membre
-    existing_member_result = await db.execute(
-        select(ProjectMember).where(
-            and_(
-                ProjectMember.project_id == project_id,
-                ProjectMember.user_id == member_data.user_id
-            )
+    """
+    Add a new member to a project. Assumes caller has verified ownership.
+    Returns None when the user doesn't exist or is already a member.
+    """
+    # Un seul INSERT ... SELECT : la ligne n'est produite que si l'utilisateur
+    # existe, ON CONFLICT l'écarte s'il est déjà membre (même en cas d'ajouts
+    # concurrents), RETURNING renvoie le membre créé
+    addable_user = select(
+        literal(str(uuid.uuid4())),
+        literal(project_id),
+        User.id,
+        literal(member_data.role),
+        literal(datetime.now(UTC)),
+    ).where(User.id == member_data.user_id)
+    query = (
+        pg_insert(ProjectMember)
+        .from_select(
+            ["id", "project_id", "user_id", "role", "created_at"],
+            addable_user
         )
+        .on_conflict_do_nothing(index_elements=["project_id", "user_id"])
+        .returning(ProjectMember)
     )
-    if existing_member_result.scalar_one_or_none():
-        # Indicate member already exists
-        # Raise exception or return a specific value? Returning None for now.
-        return None
+    result = await db.scalars(query)
+    db_member = result.one_or_none()
+    await db.commit()
+    return db_member
+
+async def add_project_members_bulk(
+    db: AsyncSession,
+    project_id: str,
+    members_data: List[ProjectMemberCreate]
+) -> List[ProjectMember]:
+    """
+    Add several members to a project at once. Assumes caller has verified ownership.
+    Unknown users and users already in the project are skipped; returns the
+    members actually added. A single INSERT ... SELECT joins the requested
+    users against users, ON CONFLICT skips the existing memberships.
+    """
+    # Un seul rôle par utilisateur, la dernière entrée l'emporte
+    roles = {member.user_id: member.role for member in members_data}
+    if not roles:
+        return []
 
-    # Créer le nouveau membre
-    db_member = ProjectMember(
-        project_id=project_id,
-        user_id=member_data.user_id,
-        role=member_data.role
+    requested = values(
+        column("id", String(36)),
+        column("user_id", String(36)),
+        column("role", String(20)),
+        name="requested"
+    ).data([(str(uuid.uuid4()), user_id, role) for user_id, role in roles.items()])
+    addable_users = (
+        select(
+            requested.c.id,
+            literal(project_id),
+            User.id,
+            requested.c.role,
+            literal(datetime.now(UTC)),
+        )
+        .select_from(requested)
+        .join(User, User.id == requested.c.user_id)
+    )
+    query = (
+        pg_insert(ProjectMember)
+        .from_select(
+            ["id", "project_id", "user_id", "role", "created_at"],
+            addable_users
+        )
+        .on_conflict_do_nothing(index_elements=["project_id", "user_id"])
+        .returning(ProjectMember)
     )
-    db.add(db_member)
+    result = await db.scalars(query)
+    db_members = list(result.all())
     await db.commit()
-    await db.refresh(db_member)
-    return db_member
+    return db_members
 
 async def get_project_members(
     db: AsyncSession,
     project_id: str
 ) -> List[ProjectMember]:
     """Get all members of a project."""
-    query = (
-        select(ProjectMember)
-        .options(selectinload(ProjectMember.user))
-        .where(ProjectMember.project_id == project_id)
-    )
-    result = await db.execute(query)
+    result = await db.execute(_SELECT_PROJECT_MEMBERS, {"project_id": project_id})
     return list(result.scalars().all())
 
 async def remove_project_member(
@@ -223,24 +338,20 @@ async def remove_project_member(
     user_id: str
 ) -> bool:
     """Remove a member from a project. Assumes caller has verified ownership."""
-    # Supprimer le membre
-    member_result = await db.execute(
-        select(ProjectMember)
+    # Supprimer le membre, DELETE ... RETURNING indique s'il existait
+    result = await db.execute(
+        delete(ProjectMember)
         .where(
             and_(
                 ProjectMember.project_id == project_id,
                 ProjectMember.user_id == user_id
             )
         )
+        .returning(ProjectMember.id)
     )
-    member = member_result.scalar_one_or_none()
-
-    if not member:
-        return False # Member not found
-
-    await db.delete(member)
+    removed = result.first() is not None
     await db.commit()
-    return True
+    return removed
 
 async def update_project_member_role(
     db: AsyncSession,
@@ -249,22 +360,18 @@ async def update_project_member_role(
     new_role: str
 ) -> Optional[ProjectMember]:
     """Update a project member's role. Assumes caller has verified ownership."""
-    # Mettre à jour le rôle du membre
-    member_result = await db.execute(
-        select(ProjectMember)
+    # Mettre à jour le rôle du membre, UPDATE ... RETURNING renvoie la ligne à jour
+    result = await db.execute(
+        update(ProjectMember)
         .where(
             and_(
                 ProjectMember.project_id == project_id,
                 ProjectMember.user_id == user_id
             )
         )
+        .values(role=new_role)
+        .returning(ProjectMember)
     )
-    member = member_result.scalar_one_or_none()
-
-    if not member:
-        return None # Member not found
-
-    member.role = new_role
+    member = result.scalars().first()
     await db.commit()
-    await db.refresh(member)
     return member 
\ No newline at end of file
@@ -1,34 +1,98 @@
-from datetime import datetime
-from typing import Optional, List
-from sqlalchemy import select, and_
+from contextvars import ContextVar
+from datetime import datetime, UTC
+from typing import Optional, List, Any
+import uuid
+from sqlalchemy import select, and_, insert, exists, literal, bindparam, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, Session
 import logging
-import asyncio # Import asyncio
 
 from src.models.user import User
 from src.schemas.user import UserCreate, UserUpdate
 
 logger = logging.getLogger(__name__)
 
+# Point lookups built once and re-executed with bound parameters, instead of
+# constructing a new Select on every call. Platform users (project_id NULL)
+# need their own statement: "project_id = :project_id" never matches NULL.
+_SELECT_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+_SELECT_USER_BY_EMAIL = select(User).where(
+    and_(
+        User.email == bindparam("email"),
+        User.project_id == bindparam("project_id")
+    )
+)
+_SELECT_PLATFORM_USER_BY_EMAIL = select(User).where(
+    and_(
+        User.email == bindparam("email"),
+        User.project_id.is_(None)
+    )
+)
+
+# Per-request cache of user lookups, keyed by ("id", user_id) or
+# ("email", email, project_id). Set to a fresh dict for each request by
+# RequestUserCacheMiddleware; lookups outside a request are not cached.
+_request_user_cache: ContextVar[Optional[dict[tuple, Optional[User]]]] = ContextVar(
+    "request_user_cache", default=None
+)
+
+def start_request_user_cache() -> Any:
+    """Start an empty user cache for the current request, returns the reset token."""
+    return _request_user_cache.set({})
+
+def end_request_user_cache(token: Any) -> None:
+    """Drop the user cache of the current request."""
+    _request_user_cache.reset(token)
+
+def _cache_user(key: tuple, user: Optional[User]) -> None:
+    cache = _request_user_cache.get()
+    if cache is None:
+        return
+    cache[key] = user
+    if user is not None:
+        cache[("id", user.id)] = user
+        cache[("email", user.email, user.project_id)] = user
+
+def _evict_cached_user(user: User) -> None:
+    cache = _request_user_cache.get()
+    if cache is None:
+        return
+    cache.pop(("id", user.id), None)
+    cache.pop(("email", user.email, user.project_id), None)
+
+async def _get_cached_user(db: AsyncSession, key: tuple) -> tuple[bool, Optional[User]]:
+    """
+    Look up a user in the request cache. A user loaded by another session
+    (e.g. the one of get_current_user) is merged into `db` without a query,
+    so callers never mutate an object owned by a different session.
+    """
+    cache = _request_user_cache.get()
+    if cache is None or key not in cache:
+        return False, None
+    user = cache[key]
+    if user is not None and user not in db:
+        user = await db.merge(user, load=False)
+    return True, user
+
 async def get_user_by_email(
     db: AsyncSession,
     email: str,
     project_id: Optional[str] = None
 ) -> Optional[User]:
     """Get a user by email, scoped by project_id if provided."""
-    logger.debug(f"Building query for user email={email}, project_id={project_id}")
-    query = select(User).where(
-        and_(
-            User.email == email,
-            User.project_id == project_id
-        )
-    )
+    found, cached_user = await _get_cached_user(db, ("email", email, project_id))
+    if found:
+        return cached_user
+    if project_id is None:
+        query, params = _SELECT_PLATFORM_USER_BY_EMAIL, {"email": email}
+    else:
+        query, params = _SELECT_USER_BY_EMAIL, {"email": email, "project_id": project_id}
     logger.debug(f"Executing query for user email={email}, project_id={project_id}")
     try:
-        result = await db.execute(query)
+        result = await db.execute(query, params)
         logger.debug(f"Query execution finished for user email={email}, project_id={project_id}. Fetching result.")
         user = result.scalar_one_or_none()
+        _cache_user(("email", email, project_id), user)
         logger.debug(f"Returning user: {bool(user)} for email={email}, project_id={project_id}")
         return user
     except Exception as e:
@@ -39,34 +103,20 @@ async def get_user_by_id(
     db: AsyncSession,
     user_id: str
 ) -> Optional[User]:
-    """Get a user by ID. Temporarily removed relationship loading."""
-    current_loop_id = id(asyncio.get_running_loop())
-    logger.debug(f"[get_user_by_id] User ID: {user_id}. Loop ID: {current_loop_id}. Session Active: {db.is_active}")
-    query = (
-        select(User)
-        # Temporarily comment out selectinload to test for loop conflict
-        # .options(selectinload(User.refresh_tokens))
-        # .options(selectinload(User.projects_owned))
-        # .options(selectinload(User.project_memberships))
-        # .options(selectinload(User.project))
-        .where(User.id == user_id)
-    )
-    logger.debug(f"Executing simplified query for user ID: {user_id} within explicit transaction")
-    user: Optional[User] = None
+    """Get a user by ID. Only the users row is loaded, relationships are lazy="raise"."""
+    found, cached_user = await _get_cached_user(db, ("id", user_id))
+    if found:
+        return cached_user
     try:
         # Wrap the execution in an explicit transaction block
         async with db.begin():
-            transaction_loop_id = id(asyncio.get_running_loop())
-            logger.debug(f"[get_user_by_id] User ID: {user_id}. Inside transaction. Loop ID: {transaction_loop_id}. In Transaction: {db.in_transaction()}")
-            result = await db.execute(query)
+            result = await db.execute(_SELECT_USER_BY_ID, {"user_id": user_id})
             user = result.scalar_one_or_none()
-            logger.debug(f"[get_user_by_id] Query executed. User found: {bool(user)}")
-        logger.debug(f"[get_user_by_id] Transaction finished. User found: {bool(user)}")
+        _cache_user(("id", user_id), user)
         return user
-    except Exception as e:
+    except Exception:
         # Log before raising
-        exception_loop_id = id(asyncio.get_running_loop())
-        logger.exception(f"[get_user_by_id] Exception for {user_id}. Loop ID: {exception_loop_id}. Error: {e}")
+        logger.exception("[get_user_by_id] Exception for %s", user_id)
         raise
 
 async def create_user(
@@ -85,6 +135,53 @@ async def create_user(
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    _cache_user(("email", db_user.email, project_id), db_user)
+    return db_user
+
+async def create_user_if_absent(
+    db: AsyncSession,
+    user_data: UserCreate,
+    hashed_password: str,
+    project_id: Optional[str] = None
+) -> Optional[User]:
+    """
+    Create a new user unless the email is already registered in that scope.
+    The existence check and the insert run as a single
+    INSERT ... SELECT ... WHERE NOT EXISTS ... RETURNING statement.
+    ON CONFLICT can't be used here since the (project_id, email) unique
+    constraint doesn't apply to platform users (project_id IS NULL).
+    Returns None if the email is already taken.
+    """
+    columns = User.__table__.c
+    values = {
+        "id": str(uuid.uuid4()),
+        "email": user_data.email,
+        "full_name": user_data.full_name,
+        "hashed_password": hashed_password,
+        "project_id": project_id,
+        "is_active": True,
+        "created_at": datetime.now(UTC),
+    }
+    email_taken = select(User.id).where(
+        and_(
+            User.email == user_data.email,
+            User.project_id == project_id
+        )
+    )
+    stmt = (
+        insert(User)
+        .from_select(
+            list(values),
+            select(*[literal(value, columns[name].type) for name, value in values.items()])
+            .where(~exists(email_taken))
+        )
+        .returning(User)
+    )
+    result = await db.execute(stmt)
+    db_user = result.scalar_one_or_none()
+    await db.commit()
+    if db_user is not None:
+        _cache_user(("email", db_user.email, project_id), db_user)
     return db_user
 
 async def update_user(
@@ -92,38 +189,52 @@ async def update_user(
     user: User,
     user_data: UserUpdate
 ) -> User:
-    """Update a user's information."""
-    update_data = user_data.model_dump(exclude_unset=True, exclude={'project_id'})
-    
-    for field, value in update_data.items():
-        # Skip password as it needs special handling
-        if field != "password":
-            setattr(user, field, value)
+    """
+    Update a user's information with a single UPDATE ... RETURNING.
+    Works whatever session `user` was loaded by: the returned instance
+    belongs to `db`.
+    """
+    _evict_cached_user(user)
+    # Password needs special handling (hashing), see update_user_password
+    update_data = user_data.model_dump(exclude_unset=True, exclude={'project_id', 'password'})
+    if not update_data:
+        return user
     
+    result = await db.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(**update_data)
+        .returning(User)
+        .execution_options(populate_existing=True)
+    )
+    updated_user = result.scalar_one()
     await db.commit()
-    await db.refresh(user)
-    return user
+    return updated_user
 
 async def update_user_password(
     db: AsyncSession,
     user: User,
     hashed_password: str
-) -> User:
-    """Update a user's password."""
-    user.hashed_password = hashed_password
+) -> bool:
+    """Update a user's password, in a single UPDATE."""
+    _evict_cached_user(user)
+    result = await db.execute(
+        update(User).where(User.id == user.id).values(hashed_password=hashed_password)
+    )
     await db.commit()
-    await db.refresh(user)
-    return user
+    return result.rowcount > 0
 
 async def deactivate_user(
     db: AsyncSession,
     user: User
-) -> User:
-    """Deactivate a user."""
-    user.is_active = False
+) -> bool:
+    """Deactivate a user, in a single UPDATE."""
+    _evict_cached_user(user)
+    result = await db.execute(
+        update(User).where(User.id == user.id).values(is_active=False)
+    )
     await db.commit()
-    await db.refresh(user)
-    return user
+    return result.rowcount > 0
 
 async def get_users(
     db: AsyncSession,
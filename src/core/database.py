@@ -18,13 +18,17 @@ else:
 
 async_engine = create_async_engine(
     async_db_url, 
-    echo=False, 
-    # connect_args might not be needed, psycopg handles SSL via DSN/env vars
-    # connect_args={"ssl": "require"}, 
-    pool_recycle=1800,
+    # Statement logging costs a logging call per query, debugging only
+    echo=settings.SQL_ECHO,
+    # psycopg handles SSL via DSN/env vars, only statement preparation is tuned here
+    connect_args={"prepare_threshold": settings.DB_PREPARE_THRESHOLD},
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
     pool_pre_ping=True, # Keep pre-ping
-    pool_size=5,       
-    max_overflow=0     
+    pool_use_lifo=True, # Reuse the most recently returned (warm) connection first
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -47,11 +51,19 @@ async def get_db():
 def get_async_session_factory():
     return AsyncSessionLocal
 
+# Set once the schema has been created in this process, so warm restarts
+# of the app skip the create_all round-trips
+_db_initialized = False
+
 # Initialize database (using async engine)
 async def init_db():
     """Create all tables in the database if they don't exist."""
+    global _db_initialized
+    if _db_initialized:
+        return
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    _db_initialized = True
 
 # REMOVED: Export all models to ensure they are registered with Base.metadata
 # This caused circular imports with Alembic.
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Optional, cast
 from fastapi import Depends, HTTPException, status, Cookie, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -16,6 +17,46 @@ logger = logging.getLogger(__name__)
 # Configuration du bearer token
 oauth2_scheme = HTTPBearer(auto_error=False)
 
+@dataclass(frozen=True, slots=True)
+class TokenPrincipal:
+    """Identity taken from a verified access token, without loading the user."""
+    id: str
+
+async def get_current_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(oauth2_scheme),
+    access_token: Optional[str] = Cookie(None, alias="access_token")
+) -> TokenPrincipal:
+    """
+    Dépendance légère : vérifie la signature et les claims du token sans
+    accès à la base. Réservée aux routes en lecture qui n'ont besoin que de
+    l'id : un utilisateur désactivé garde l'accès jusqu'à l'expiration du token.
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Un seul décodage, le type est vérifié sur le payload
+    payload = decode_token(token)
+    if payload.get("type") != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user_id = payload.get("sub")
+    if not isinstance(user_id, str) or not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return TokenPrincipal(id=user_id)
+
 async def get_current_user(
     request: Request,
     async_session_factory: async_sessionmaker[AsyncSession] = Depends(get_async_session_factory),
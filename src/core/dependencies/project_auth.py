@@ -1,24 +1,56 @@
+import hashlib
+from dataclasses import dataclass
 from typing import Annotated, Optional, cast
 
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials # Import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_db
-from src.core.crud.api_key import validate_project_api_key
+from src.core.crud.api_key import validate_project_api_key, record_api_key_use
 # Import JWT decode/verify functions and user CRUD
 from src.core.security.jwt import decode_token, verify_token_type
 from src.core.crud.user import get_user_by_id 
-from src.models.project import Project
 from src.models.user import User # Import User model
+from src.core.config import get_settings
+
+settings = get_settings()
 
 # Shared HTTPBearer scheme
 oauth2_scheme_client = HTTPBearer(auto_error=False)
 
+@dataclass(frozen=True, slots=True)
+class ApiKeyProject:
+    """Plain snapshot of the project an API key resolves to, safe to share across requests."""
+    id: str
+    name: str
+    key_id: str
+
+# Resolved API keys, keyed by a digest of the key so raw keys aren't kept in
+# memory. Only valid keys are cached; entries live at most
+# API_KEY_CACHE_TTL_SECONDS, after which the key is checked in the database again.
+_api_key_cache: TTLCache = TTLCache(
+    maxsize=settings.API_KEY_CACHE_MAX_SIZE,
+    ttl=settings.API_KEY_CACHE_TTL_SECONDS
+)
+
+def _api_key_digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+# Digests cached per project, so invalidation doesn't scan the whole cache.
+# May still list digests the TTL already expired, popping those is a no-op.
+_api_key_digests_by_project: dict[str, set[bytes]] = {}
+
+def invalidate_project_api_keys(project_id: str) -> None:
+    """Drop the cached API keys of a project, after its keys or the project itself changed."""
+    for digest in _api_key_digests_by_project.pop(project_id, ()):
+        _api_key_cache.pop(digest, None)
+
 async def validate_api_key(
     x_project_api_key: Annotated[str | None, Header()] = None, # Get key from header
     db: AsyncSession = Depends(get_db)
-) -> Project:
+) -> ApiKeyProject:
     """Dependency to validate the X-Project-Api-Key header and return the active Project."""
     if not x_project_api_key:
         raise HTTPException(
@@ -26,18 +58,28 @@ async def validate_api_key(
             detail="Missing X-Project-Api-Key header"
         )
 
-    project = await validate_project_api_key(db, x_project_api_key)
+    digest = _api_key_digest(x_project_api_key)
+    cached = _api_key_cache.get(digest)
+    if cached is not None:
+        record_api_key_use(cached.key_id)
+        return cached
+
+    validated = await validate_project_api_key(db, x_project_api_key)
     
-    if not project:
+    if not validated:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, # Use 403 as the key exists but is invalid/inactive
             detail="Invalid or inactive Project API Key"
         )
+    project, key_id = validated
     
-    # TODO: Consider updating api key last_used_at timestamp here
-    # await update_api_key_last_used(db, x_project_api_key) 
+    # last_used_at is written in batches by a background task, not per request
+    record_api_key_use(key_id)
     
-    return project 
+    resolved = ApiKeyProject(id=project.id, name=project.name, key_id=key_id)
+    _api_key_cache[digest] = resolved
+    _api_key_digests_by_project.setdefault(project.id, set()).add(digest)
+    return resolved
 
 async def get_current_client_user(
     credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(oauth2_scheme_client)],
@@ -1,12 +1,80 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta, UTC
 from typing import Optional
-from jose import JWTError, jwt
+
+import orjson
+from cachetools import TTLCache
 from fastapi import HTTPException, status
 
 from src.core.config import get_settings
 
 settings = get_settings()
 
+# HMAC-signed JWTs are encoded/verified directly with hmac + orjson: the
+# signing key and the header segment are built once at import instead of
+# on every call. Digests are given by name so hmac.digest() runs the whole
+# MAC in OpenSSL (SHA-NI / ARMv8 crypto extensions when the CPU has them).
+_HMAC_DIGESTS = {
+    "HS256": "sha256",
+    "HS384": "sha384",
+    "HS512": "sha512",
+}
+if settings.JWT_ALGORITHM not in _HMAC_DIGESTS:
+    raise ValueError(
+        f"Unsupported JWT_ALGORITHM {settings.JWT_ALGORITHM!r}, "
+        f"expected one of {', '.join(_HMAC_DIGESTS)}"
+    )
+
+_KEY = settings.JWT_SECRET_KEY.encode()
+_DIGEST = _HMAC_DIGESTS[settings.JWT_ALGORITHM]
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+_HEADER_B64 = _b64encode(orjson.dumps({"alg": settings.JWT_ALGORITHM, "typ": "JWT"}))
+
+def _sign(signing_input: bytes) -> bytes:
+    return hmac.digest(_KEY, signing_input, _DIGEST)
+
+def _encode(claims: dict) -> str:
+    signing_input = _HEADER_B64 + b"." + _b64encode(orjson.dumps(claims))
+    return (signing_input + b"." + _b64encode(_sign(signing_input))).decode()
+
+# Claims of recently verified tokens, keyed by a digest of the token so raw
+# tokens aren't kept as keys. verify_token_type + decode_token on the same
+# token (every authenticated request) only check the signature once.
+# Expiry is still checked on every call.
+_verified_claims: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+class _InvalidToken(Exception):
+    pass
+
+def _decode(token: str) -> dict:
+    """Check the header and signature of a token and return its claims."""
+    try:
+        signing_input, signature = token.encode().rsplit(b".", 1)
+        header_b64, payload_b64 = signing_input.split(b".")
+        if not hmac.compare_digest(_sign(signing_input), _b64decode(signature)):
+            raise _InvalidToken()
+        # Don't trust the token's own alg, it must be the configured one
+        if header_b64 != _HEADER_B64:
+            header = orjson.loads(_b64decode(header_b64))
+            if not isinstance(header, dict) or header.get("alg") != settings.JWT_ALGORITHM:
+                raise _InvalidToken()
+        payload = orjson.loads(_b64decode(payload_b64))
+    except (ValueError, binascii.Error, orjson.JSONDecodeError):
+        raise _InvalidToken()
+    if not isinstance(payload, dict):
+        raise _InvalidToken()
+    return payload
+
 def create_access_token(
     subject: str,
     expires_delta: Optional[timedelta] = None
@@ -23,15 +91,11 @@ def create_access_token(
     
     to_encode = {
         "sub": str(subject),
-        "exp": expire,
+        "exp": int(expire.timestamp()),
         "type": "access"
     }
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM
-    )
+    encoded_jwt = _encode(to_encode)
     
     return encoded_jwt
 
@@ -51,42 +115,62 @@ def create_refresh_token(
     
     to_encode = {
         "sub": str(subject),
-        "exp": expire,
+        "exp": int(expire.timestamp()),
         "type": "refresh"
     }
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM
-    )
+    encoded_jwt = _encode(to_encode)
     
     return encoded_jwt
 
+def create_token_pair(subject: str) -> tuple[str, str]:
+    """
+    Create an access token and a refresh token for the same subject.
+    The current time is resolved once for both tokens.
+    :param subject: Usually the user ID
+    :return: (access_token, refresh_token)
+    """
+    now = datetime.now(UTC)
+    sub = str(subject)
+    
+    access_token = _encode({
+        "sub": sub,
+        "exp": int((now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)).timestamp()),
+        "type": "access"
+    })
+    refresh_token = _encode({
+        "sub": sub,
+        "exp": int((now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)).timestamp()),
+        "type": "refresh"
+    })
+    
+    return access_token, refresh_token
+
 def decode_token(token: str) -> dict:
     """
     Decode and validate a JWT token.
     Raises HTTPException if token is invalid.
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        payload = _verified_claims.get(key)
+        if payload is None:
+            payload = _verified_claims[key] = _decode(token)
         
-        # Vérifier que le token n'est pas expiré
+        # Vérifier que le token n'est pas expiré (time.time() : même epoch
+        # que datetime.now(UTC).timestamp(), sans construire de datetime)
         exp = payload.get("exp")
-        if not exp or datetime.fromtimestamp(exp, UTC) < datetime.now(UTC):
+        if not isinstance(exp, (int, float)) or exp < time.time():
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token has expired",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        return payload
+        # Copie : le dict en cache est partagé entre les requêtes
+        return dict(payload)
         
-    except JWTError:
+    except _InvalidToken:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
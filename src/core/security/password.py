@@ -1,15 +1,128 @@
-from passlib.context import CryptContext
+import asyncio
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-# Configuration du contexte de hachage avec Bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import bcrypt
+from cachetools import TTLCache
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+# Successful verifications, keyed by an HMAC of (user id, stored hash, password).
+# Including the stored hash means a password change never hits a stale entry;
+# keying the HMAC with the server secret means a memory dump of the cache
+# can't be brute-forced offline the way a plain SHA-256 could.
+_verify_cache: TTLCache = TTLCache(maxsize=4096, ttl=settings.PASSWORD_VERIFY_CACHE_TTL_SECONDS)
+_VERIFY_CACHE_KEY = settings.SECRET_KEY.encode("utf-8")
+
+# Dedicated pool for bcrypt work. bcrypt releases the GIL while hashing, so
+# threads run in parallel on all cores without process start-up or pickling.
+_password_pool: Optional[ThreadPoolExecutor] = None
+
+_POOL_WORKERS = os.cpu_count() or 1
+
+# bcrypt jobs submitted and not finished yet. Past the limit, callers get
+# PasswordPoolBusy right away instead of queueing behind seconds of hashing.
+_pending_jobs = 0
+_MAX_PENDING_JOBS = _POOL_WORKERS * (1 + settings.PASSWORD_POOL_QUEUE_PER_WORKER)
+
+class PasswordPoolBusy(Exception):
+    """Raised when the bcrypt pool is saturated, mapped to a 503 by the app."""
+
+def get_password_pool() -> ThreadPoolExecutor:
+    """Return the bcrypt worker pool, creating it on first use."""
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ThreadPoolExecutor(
+            max_workers=_POOL_WORKERS,
+            thread_name_prefix="bcrypt"
+        )
+    return _password_pool
+
+def password_pool_pending() -> int:
+    """Number of bcrypt jobs running or queued in this process."""
+    return _pending_jobs
+
+async def _run_in_password_pool(func, *args):
+    global _pending_jobs
+    if _pending_jobs >= _MAX_PENDING_JOBS:
+        raise PasswordPoolBusy()
+    _pending_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_pool(), func, *args)
+    finally:
+        _pending_jobs -= 1
+
+def shutdown_password_pool() -> None:
+    """Stop the bcrypt worker pool."""
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(wait=False)
+        _password_pool = None
+
+# Character classes required by is_password_strong
+_HAS_UPPER = 1
+_HAS_LOWER = 2
+_HAS_DIGIT = 4
+_HAS_SPECIAL = 8
+_ALL_CLASSES = _HAS_UPPER | _HAS_LOWER | _HAS_DIGIT | _HAS_SPECIAL
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    """Hash a password using bcrypt with the configured work factor."""
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+def hash_many(passwords: List[str]) -> List[str]:
+    """
+    Hash several passwords in parallel on the bcrypt pool, results in input
+    order. Blocking: meant for scripts and migrations, not request handlers.
+    """
+    return list(get_password_pool().map(hash_password, passwords))
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password in the bcrypt pool without blocking the event loop."""
+    return await _run_in_password_pool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the bcrypt pool without blocking the event loop."""
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Check if a bcrypt hash ($2b$<cost>$...) uses another work factor than configured."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+async def verify_password_cached(user_id: str, plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password off the event loop, skipping bcrypt when the same
+    credentials were verified successfully within the cache TTL.
+    Only successful checks are cached, failed attempts always pay for bcrypt.
+    """
+    if not settings.PASSWORD_VERIFY_CACHE_ENABLED:
+        return await verify_password_async(plain_password, hashed_password)
+    
+    key = hmac.digest(
+        _VERIFY_CACHE_KEY,
+        f"{user_id}|{hashed_password}|{plain_password}".encode("utf-8"),
+        "sha256"
+    )
+    if key in _verify_cache:
+        return True
+    
+    is_valid = await verify_password_async(plain_password, hashed_password)
+    if is_valid:
+        _verify_cache[key] = True
+    return is_valid
 
 def is_password_strong(password: str) -> bool:
     """
@@ -24,9 +137,18 @@ def is_password_strong(password: str) -> bool:
     if len(password) < 8:
         return False
     
-    has_upper = any(c.isupper() for c in password)
-    has_lower = any(c.islower() for c in password)
-    has_digit = any(c.isdigit() for c in password)
-    has_special = any(not c.isalnum() for c in password)
+    # Single pass over the characters, stopping as soon as every class is seen
+    flags = 0
+    for c in password:
+        if c.isupper():
+            flags |= _HAS_UPPER
+        elif c.islower():
+            flags |= _HAS_LOWER
+        elif c.isdigit():
+            flags |= _HAS_DIGIT
+        elif not c.isalnum():
+            flags |= _HAS_SPECIAL
+        if flags == _ALL_CLASSES:
+            return True
     
-    return all([has_upper, has_lower, has_digit, has_special]) 
\ No newline at end of file
+    return False
\ No newline at end of file
@@ -1,3 +1,4 @@
+import hashlib
 import secrets
 import uuid
 from datetime import datetime, UTC
@@ -9,6 +10,13 @@ def generate_project_api_key() -> str:
     random_part = secrets.token_urlsafe(32)
     return f"ma_{timestamp}_{random_part}"
 
+# "ma_<10-digit timestamp>_" plus the first 4 random characters
+API_KEY_PREFIX_LENGTH = 18
+
+def hash_project_api_key(api_key: str) -> bytes:
+    """Digest under which a project API key is stored and looked up."""
+    return hashlib.sha256(api_key.encode()).digest()
+
 def validate_project_api_key(api_key: str) -> bool:
     """Validate the format of a project API key."""
     try:
@@ -2,7 +2,7 @@ from datetime import datetime, UTC
 import uuid
 from typing import List, TYPE_CHECKING, Optional
 
-from sqlalchemy import String, DateTime, Boolean, ForeignKey
+from sqlalchemy import String, DateTime, Boolean, ForeignKey, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -33,6 +33,11 @@ class ProjectMember(Base):
     project: Mapped["Project"] = relationship("Project", back_populates="members")
     user: Mapped[Optional["User"]] = relationship("User", back_populates="project_memberships")
 
+    __table_args__ = (
+        # A user is in a project once, concurrent adds fall back on ON CONFLICT
+        UniqueConstraint("project_id", "user_id", name="uq_project_members_project_id_user_id"),
+    )
+
 class Project(Base):
     __tablename__ = "projects"
 
@@ -63,6 +68,12 @@ class Project(Base):
         "ProjectMember", back_populates="project", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # Serves the newest-first keyset pages of an owner's projects
+        # (scanned backwards for ORDER BY created_at DESC, id DESC)
+        Index("ix_projects_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
+
 class ProjectApiKey(Base):
     __tablename__ = "project_api_keys"
 
@@ -73,7 +84,11 @@ class ProjectApiKey(Base):
         String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
     )
     name: Mapped[str] = mapped_column(String(50), nullable=False)
-    key: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    # SHA-256 of the key, the key itself is only shown once at creation.
+    # Lookups hash the presented key and match it on a fixed 32-byte index.
+    key_hash: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True, nullable=False)
+    # Leading characters of the key, enough for owners to tell keys apart
+    key_prefix: Mapped[str] = mapped_column(String(20), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC)
     )
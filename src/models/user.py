@@ -2,7 +2,7 @@ from datetime import datetime, UTC
 import uuid
 from typing import List, Optional, TYPE_CHECKING
 
-from sqlalchemy import String, DateTime, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import String, DateTime, Boolean, ForeignKey, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -26,6 +26,7 @@ class User(Base):
         String(255), nullable=False 
     )
     full_name: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # bcrypt hash, the only human-chosen secret in the schema
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
@@ -44,19 +45,23 @@ class User(Base):
         foreign_keys=[project_id]
     )
     
+    # Collections below are never needed on the auth paths: lazy="raise"
+    # turns an accidental lazy load (an extra query per user) into an error
     refresh_tokens: Mapped[List["RefreshToken"]] = relationship(
-        "RefreshToken", back_populates="user", cascade="all, delete-orphan"
+        "RefreshToken", back_populates="user", cascade="all, delete-orphan", lazy="raise"
     )
     projects_owned: Mapped[List["Project"]] = relationship(
         "Project", 
         back_populates="owner", 
         foreign_keys="Project.owner_id",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="raise"
     )
     project_memberships: Mapped[List["ProjectMember"]] = relationship(
         "ProjectMember", 
         back_populates="user", 
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy="raise"
     )
 
 class RefreshToken(Base):
@@ -65,13 +70,16 @@ class RefreshToken(Base):
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
-    token: Mapped[str] = mapped_column(
-        String(255), unique=True, index=True, nullable=False
+    # SHA-256 of the signed JWT, the token itself is never stored. Fixed
+    # 32-byte keys keep the unique index small.
+    token_hash: Mapped[bytes] = mapped_column(
+        LargeBinary(32), unique=True, index=True, nullable=False
     )
     user_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Indexed for the periodic purge of expired tokens
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC)
     )
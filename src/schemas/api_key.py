@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 class ProjectApiKeyBase(BaseModel):
@@ -11,10 +11,19 @@ class ProjectApiKeyCreate(ProjectApiKeyBase):
 class ProjectApiKey(ProjectApiKeyBase):
     id: str
     project_id: str
-    key: str
+    # The full key is only returned once, by ProjectApiKeyCreated
+    key_prefix: str
     created_at: datetime
     last_used_at: Optional[datetime] = None
     is_active: bool = True
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class ProjectApiKeyCreated(ProjectApiKey):
+    key: str
+
+class ProjectApiKeyList(BaseModel):
+    items: List[ProjectApiKey]
+    # Pass as `cursor` to get the next page, None on the last page
+    next_cursor: Optional[str] = None
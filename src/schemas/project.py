@@ -45,4 +45,10 @@ class Project(ProjectBase):
 
 class ProjectList(BaseModel):
     items: List[Project]
-    total: int 
\ No newline at end of file
+    total: int
+    # Pass as `cursor` to get the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+class ProjectCreated(Project):
+    # Raw value of the initial API key, not retrievable afterwards
+    api_key: str
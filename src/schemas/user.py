@@ -13,8 +13,11 @@ class UserCreate(UserBase):
     password: str = Field(..., min_length=8)
     confirm_password: str
 
+    def passwords_match(self) -> bool:
+        return self.password == self.confirm_password
+
     def validate_passwords_match(self):
-        if self.password != self.confirm_password:
+        if not self.passwords_match():
             raise ValueError("Passwords do not match")
 
 class UserLogin(BaseModel):
@@ -45,4 +48,16 @@ class UserRead(UserBase):
     updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+_USER_READ_FIELDS = tuple(UserRead.model_fields)
+
+def user_read_from_orm(user) -> UserRead:
+    """
+    Build a UserRead from a User row without re-validating it.
+    The values come straight from the database, so model_construct is safe
+    and skips the per-field validation of model_validate.
+    """
+    return UserRead.model_construct(
+        **{field: getattr(user, field) for field in _USER_READ_FIELDS}
+    )
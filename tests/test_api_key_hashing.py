@@ -0,0 +1,52 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+from src.core.crud import api_key as api_key_crud
+
+
+class _LookupSession:
+    """Stands in for the session, records the lookup and returns one row."""
+
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+
+    async def execute(self, query, params):
+        self.executed.append((query, params))
+        return SimpleNamespace(first=lambda: self.row)
+
+
+def test_new_api_key_stores_the_digest_and_prefix_only():
+    api_key, raw_key = api_key_crud.new_api_key("ci", "project-1")
+
+    assert api_key.key_hash == hashlib.sha256(raw_key.encode()).digest()
+    assert api_key.key_prefix == raw_key[:18]
+    assert raw_key.startswith(api_key.key_prefix)
+    assert raw_key.encode() != api_key.key_hash
+    assert raw_key not in vars(api_key).values()
+
+
+def test_new_api_keys_are_unique():
+    first, _ = api_key_crud.new_api_key("a")
+    second, _ = api_key_crud.new_api_key("b")
+
+    assert first.key_hash != second.key_hash
+
+
+def test_validate_looks_the_key_up_by_its_digest():
+    project = SimpleNamespace(id="project-1", name="demo")
+    db = _LookupSession(row=(project, "key-1"))
+
+    result = asyncio.run(api_key_crud.validate_project_api_key(db, "ma_123_secret"))
+
+    assert result == (project, "key-1")
+    [(query, params)] = db.executed
+    assert query is api_key_crud._SELECT_ACTIVE_KEY_PROJECT
+    assert params == {"key_hash": hashlib.sha256(b"ma_123_secret").digest()}
+
+
+def test_validate_returns_none_for_an_unknown_key():
+    db = _LookupSession(row=None)
+
+    assert asyncio.run(api_key_crud.validate_project_api_key(db, "ma_123_nope")) is None
@@ -0,0 +1,140 @@
+import base64
+import hmac
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.core.security import jwt
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _token(header: dict, claims: dict, digest: str = "sha256") -> str:
+    """Sign a token with the configured secret, the way python-jose did."""
+    signing_input = (
+        _b64(json.dumps(header, separators=(",", ":"), sort_keys=True).encode())
+        + "."
+        + _b64(json.dumps(claims, separators=(",", ":")).encode())
+    )
+    signature = hmac.digest(jwt.settings.JWT_SECRET_KEY.encode(), signing_input.encode(), digest)
+    return signing_input + "." + _b64(signature)
+
+
+def _claims(**extra):
+    return {"sub": "user-1", "exp": 4102444800, "type": "access", **extra}
+
+
+def _rejected(token: str) -> HTTPException:
+    with pytest.raises(HTTPException) as exc_info:
+        jwt.decode_token(token)
+    assert exc_info.value.status_code == 401
+    return exc_info.value
+
+
+@pytest.fixture(autouse=True)
+def _empty_claims_cache():
+    jwt._verified_claims.clear()
+    yield
+    jwt._verified_claims.clear()
+
+
+def test_round_trip():
+    access_token, refresh_token = jwt.create_token_pair("user-1")
+
+    assert jwt.decode_token(access_token)["sub"] == "user-1"
+    assert jwt.verify_token_type(access_token, "access")
+    assert jwt.verify_token_type(refresh_token, "refresh")
+    assert not jwt.verify_token_type(refresh_token, "access")
+
+
+def test_header_is_byte_identical_to_jose():
+    # python-jose serialized the header with sorted keys and no spaces
+    jose_header = json.dumps(
+        {"alg": jwt.settings.JWT_ALGORITHM, "typ": "JWT"}, separators=(",", ":"), sort_keys=True
+    ).encode()
+    assert jwt._HEADER_B64 == _b64(jose_header).encode()
+
+
+def test_token_issued_by_jose_still_verifies():
+    token = _token({"alg": jwt.settings.JWT_ALGORITHM, "typ": "JWT"}, _claims())
+
+    assert jwt.decode_token(token)["sub"] == "user-1"
+
+
+def test_tampered_signature_is_rejected():
+    token = jwt.create_access_token("user-1")
+    signing_input, signature = token.rsplit(".", 1)
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+
+    _rejected(signing_input + "." + flipped)
+
+
+def test_tampered_payload_is_rejected():
+    header, _, signature = jwt.create_access_token("user-1").split(".")
+    forged = _b64(json.dumps(_claims(sub="someone-else")).encode())
+
+    _rejected(f"{header}.{forged}.{signature}")
+
+
+def test_alg_none_is_rejected():
+    header = _b64(b'{"alg":"none","typ":"JWT"}')
+    payload = _b64(json.dumps(_claims()).encode())
+
+    _rejected(f"{header}.{payload}.")
+
+
+def test_foreign_alg_header_is_rejected_even_with_a_valid_mac():
+    # Signed with the real secret and the configured digest, but the header
+    # names another algorithm: the configured one must win
+    signing_input = _b64(b'{"alg":"none","typ":"JWT"}') + "." + _b64(json.dumps(_claims()).encode())
+    signature = _b64(jwt._sign(signing_input.encode()))
+
+    _rejected(f"{signing_input}.{signature}")
+
+
+def test_token_signed_with_another_hmac_digest_is_rejected():
+    _rejected(_token({"alg": "HS512", "typ": "JWT"}, _claims(), digest="sha512"))
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "onlyone",
+    "two.segments",
+    "a.b.c.d",
+    "!!!.###.$$$",
+    "eyJhbGciOiJIUzI1NiJ9.bm90IGpzb24.c2ln",
+])
+def test_malformed_tokens_are_rejected(token):
+    _rejected(token)
+
+
+def test_non_object_payload_is_rejected():
+    _rejected(_token({"alg": jwt.settings.JWT_ALGORITHM, "typ": "JWT"}, ["not", "a", "dict"]))
+
+
+def test_expired_token_is_rejected():
+    token = _token({"alg": jwt.settings.JWT_ALGORITHM, "typ": "JWT"}, _claims(exp=1))
+
+    assert _rejected(token).detail == "Token has expired"
+
+
+def test_expiry_is_checked_on_cached_claims(monkeypatch):
+    token = jwt.create_access_token("user-1")
+    jwt.decode_token(token)
+    assert len(jwt._verified_claims) == 1
+
+    # The claims are still cached, the expiry must be checked anyway
+    monkeypatch.setattr(jwt, "time", SimpleNamespace(time=lambda: 4102444800 * 2))
+
+    assert _rejected(token).detail == "Token has expired"
+
+
+def test_cached_claims_are_not_shared_with_callers():
+    token = jwt.create_access_token("user-1")
+    jwt.decode_token(token)["sub"] = "someone-else"
+
+    assert jwt.decode_token(token)["sub"] == "user-1"
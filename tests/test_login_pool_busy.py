@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+
+from main import create_app
+from src.api.v1 import auth
+from src.core.database import get_db
+from src.core.security import password
+
+
+async def _no_db():
+    yield None
+
+
+async def _no_user(db, email, project_id=None):
+    return None
+
+
+def test_login_returns_503_when_password_pool_is_busy(monkeypatch):
+    # Fill the pool up to its limit, the next bcrypt job must be refused
+    monkeypatch.setattr(password, "_pending_jobs", password._MAX_PENDING_JOBS)
+    monkeypatch.setattr(auth, "get_user_by_email", _no_user)
+
+    app = create_app()
+    app.dependency_overrides[get_db] = _no_db
+    # No context manager: startup (database init) is not needed here
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "someone@example.com", "password": "whatever"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,58 @@
+import asyncio
+from collections import namedtuple
+from types import SimpleNamespace
+
+from src.core.crud import project as project_crud
+
+Row = namedtuple("Row", ["Project", "total"])
+
+
+class _CountSession:
+    """Stands in for the session, answers the standalone COUNT query."""
+
+    def __init__(self, count):
+        self.count = count
+        self.executed = []
+
+    async def execute(self, query, params):
+        self.executed.append((query, params))
+        return SimpleNamespace(scalar_one=lambda: self.count)
+
+
+def _rows(n, total):
+    return [Row(SimpleNamespace(id=f"p{i}"), total) for i in range(n)]
+
+
+def _page(db, rows, limit):
+    return asyncio.run(project_crud._page_with_total(
+        db, rows, limit, project_crud._COUNT_USER_PROJECTS, {"owner_id": "u"}
+    ))
+
+
+def test_extra_row_sets_the_next_cursor_and_is_not_returned():
+    db = _CountSession(count=0)
+    projects, total, next_cursor = _page(db, _rows(3, total=7), limit=2)
+
+    assert [p.id for p in projects] == ["p0", "p1"]
+    assert total == 7
+    assert next_cursor == "p1"
+    assert db.executed == []
+
+
+def test_exact_multiple_of_limit_has_no_next_cursor():
+    projects, total, next_cursor = _page(_CountSession(count=0), _rows(2, total=4), limit=2)
+
+    assert len(projects) == 2
+    assert total == 4
+    assert next_cursor is None
+
+
+def test_empty_page_still_reports_the_total():
+    # Past the last page, or a cursor pointing at a deleted project
+    db = _CountSession(count=4)
+    projects, total, next_cursor = _page(db, [], limit=2)
+
+    assert projects == []
+    assert total == 4
+    assert next_cursor is None
+    assert db.executed == [(project_crud._COUNT_USER_PROJECTS, {"owner_id": "u"})]
@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+from datetime import timedelta
+from types import SimpleNamespace
+
+from src.core.crud import auth as auth_crud
+
+
+class _TokenSession:
+    """Stands in for the session, records what is added and executed."""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.added = []
+        self.executed = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+    async def execute(self, query, params=None):
+        self.executed.append((query, params))
+        return SimpleNamespace(
+            scalar_one_or_none=lambda: self.row,
+            first=lambda: self.row,
+        )
+
+
+def test_create_stores_the_digest_not_the_token():
+    db = _TokenSession()
+
+    db_token = asyncio.run(auth_crud.create_refresh_token(
+        db, "user-1", "raw.refresh.token", timedelta(days=7)
+    ))
+
+    assert db.added == [db_token]
+    assert db_token.token_hash == hashlib.sha256(b"raw.refresh.token").digest()
+    assert "raw.refresh.token" not in vars(db_token).values()
+
+
+def test_get_looks_the_token_up_by_its_digest():
+    stored = SimpleNamespace(user_id="user-1")
+    db = _TokenSession(row=stored)
+
+    assert asyncio.run(auth_crud.get_refresh_token(db, "raw.refresh.token")) is stored
+    [(query, params)] = db.executed
+    assert query is auth_crud._SELECT_REFRESH_TOKEN
+    assert params["token_hash"] == hashlib.sha256(b"raw.refresh.token").digest()
+
+
+def test_get_with_user_looks_the_token_up_by_its_digest():
+    stored, user = SimpleNamespace(), SimpleNamespace(id="user-1")
+    db = _TokenSession(row=(stored, user))
+
+    assert asyncio.run(auth_crud.get_refresh_token_with_user(db, "raw.refresh.token")) == (stored, user)
+    [(query, params)] = db.executed
+    assert query is auth_crud._SELECT_REFRESH_TOKEN_WITH_USER
+    assert params["token_hash"] == hashlib.sha256(b"raw.refresh.token").digest()